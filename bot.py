@@ -2,17 +2,29 @@
 
 from pyrogram import Client
 from pyrogram.enums import ParseMode
+import asyncio
 import sys
+import time
 from datetime import datetime
 import config
 from helper import MongoDB
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from helper.auto_delete import AutoDeleteScheduler
+from helper.broadcast import resume_broadcasts
+from helper.cache import TTLCache
+from helper.invite_links import InviteLinkPool
+from helper.premium_expiry import PremiumExpiryScheduler
+from helper.verify_pool import VerifyLinkPool
+from helper.rate_limiter import KeyedRateLimiter
+from helper.metrics import BotMetrics
+from helper.link_codec import LinkCodec, derive_key
+from helper.maintenance import maintenance
 
 version = "v1.0.0"
 
 async def daily_reset_task(bot_instance):
     bot_instance.LOGGER(__name__, bot_instance.session_name).debug("SCHEDULER: Resetting daily verification counts.")
     await bot_instance.mongodb.reset_all_verify_counts()
+    await bot_instance.mongodb.reconcile_user_count()
 
 # Reverted: Removed ad_wait_time and bypass_timeout from __init__
 class Bot(Client):
@@ -39,8 +51,16 @@ class Bot(Client):
         self.uptime = datetime.now()
         self.req_channels = []
         self.fsub_dict = {}
-        self.user_cache = {}
-        self.scheduler = AsyncIOScheduler(timezone="Asia/Kolkata")
+        self._fsub_task = None
+        self.metrics = BotMetrics(session)
+        self.link_codec = None
+        self.chat_limiter = KeyedRateLimiter(config.DELIVERY_RATE, config.DELIVERY_BURST, name="delivery")
+        self.auto_delete = AutoDeleteScheduler(self)
+        self.sub_cache = TTLCache(config.SUB_CACHE_SIZE, config.SUB_CACHE_TTL)
+        self.invite_links = InviteLinkPool(self)
+        self.verify_pool = VerifyLinkPool(self)
+        self.pro_expiry = PremiumExpiryScheduler(self)
+        self.profile_cache = TTLCache(config.PROFILE_CACHE_SIZE, config.PROFILE_CACHE_TTL)
         
         self.verify_expire = config.VERIFY_EXPIRE
 
@@ -59,11 +79,75 @@ class Bot(Client):
             "verify_expire": self.verify_expire
         }
 
+    async def _timed(self, timings: dict, phase: str, coro):
+        started = time.monotonic()
+        try:
+            return await coro
+        finally:
+            timings[phase] = time.monotonic() - started
+
+    async def _prepare_database(self):
+        await self.mongodb.ensure_indexes()
+        self.mongodb.start_counter_flusher()
+        await self.mongodb.migrate_channel_users()
+        if config.DB_AUDIT:
+            await self.mongodb.audit_query_plans()
+
+    async def _load_link_codec(self):
+        secret = config.LINK_SECRET
+        if not secret:
+            # Not the bot token: links must outlive a token revoke and verify across bots sharing a channel.
+            secret = await self.mongodb.get_link_secret()
+            self.LOGGER(__name__, self.session_name).warning(
+                "LINK_SECRET is not set, signing file links with a secret stored in MongoDB. "
+                "Set LINK_SECRET so links stay valid if the database changes."
+            )
+        db = self.initial_config['db']
+        self.link_codec = LinkCodec(db, derive_key(secret, db), config.ACCEPT_LEGACY_LINKS)
+
+    async def _check_db_channel(self):
+        try:
+            self.db = self.initial_config['db']
+            self.db_channel = await self.get_chat(self.db)
+            test = await self.send_message(chat_id=self.db_channel.id, text="Bot testing message...")
+            await test.delete()
+            return True
+        except Exception as e:
+            self.LOGGER(__name__, self.session_name).warning(e)
+            self.LOGGER(__name__, self.session_name).warning(f"Make sure bot is Admin in DB Channel: {self.db}")
+            return False
+
+    async def resolve_fsub_channel(self, channel_id):
+        """Fill in the title and invite link of an fsub channel, returning (name, link)"""
+        entry = self.fsub_dict[channel_id]
+        if entry[1] is None:
+            chat = await self.get_chat(channel_id)
+            link = chat.invite_link or (await self.create_chat_invite_link(channel_id, creates_join_request=entry[2])).invite_link
+            entry[0], entry[1] = chat.title, link
+        return entry[0], entry[1]
+
+    async def _resolve_fsub_channels(self):
+        started = time.monotonic()
+        channel_ids = list(self.fsub_dict)
+        results = await asyncio.gather(*[self.resolve_fsub_channel(channel_id) for channel_id in channel_ids], return_exceptions=True)
+        for channel_id, result in zip(channel_ids, results):
+            if isinstance(result, Exception):
+                # Same as before lazy resolution: a channel the bot can't read is not enforced.
+                self.LOGGER(__name__, self.session_name).warning(f"F-Sub error for channel {channel_id}: {result}")
+                self.fsub_dict.pop(channel_id, None)
+        self.req_channels = [channel_id for channel_id, entry in self.fsub_dict.items() if entry[2]]
+        await self.mongodb.set_channels(self.req_channels)
+        self.LOGGER(__name__, self.session_name).info(
+            f"Resolved {len(self.fsub_dict)}/{len(channel_ids)} F-Sub channel(s) in {time.monotonic() - started:.2f}s"
+        )
+
     async def start(self):
-        await super().start()
+        timings = {}
+        started = time.monotonic()
+        await self._timed(timings, "connect", super().start())
         
         file_config = self.initial_config.copy()
-        db_settings = await self.mongodb.load_settings(self.session_name)
+        db_settings = await self._timed(timings, "load_settings", self.mongodb.load_settings(self.session_name))
 
         if db_settings:
             final_config = file_config
@@ -94,40 +178,47 @@ class Bot(Client):
             self.reply_text = file_config['messages'].get('REPLY', '')
             self.verify_expire = config.VERIFY_EXPIRE
 
-        await self.mongodb.save_settings(self.session_name, self.get_current_settings())
-
         if self.owner not in self.admins:
             self.admins.append(self.owner)
 
-        self.scheduler.add_job(daily_reset_task, "cron", hour=0, minute=0, args=[self])
-        self.scheduler.start()
-
-        usr_bot_me = await self.get_me()
-        
-        if len(self.fsub) > 0:
-            for channel in self.fsub:
-                try:
-                    chat = await self.get_chat(channel[0])
-                    name = chat.title
-                    link = chat.invite_link or (await self.create_chat_invite_link(channel[0], creates_join_request=channel[1])).invite_link
-                    self.fsub_dict[channel[0]] = [name, link, channel[1], channel[2]]
-                    if channel[1]: self.req_channels.append(channel[0])
-                except Exception as e: self.LOGGER(__name__, self.session_name).warning(f"F-Sub error for channel {channel[0]}: {e}")
-            await self.mongodb.set_channels(self.req_channels)
+        # F-Sub is enforced right away from the configured ids; titles and links are fetched in the background.
+        for channel in self.fsub:
+            self.fsub_dict[channel[0]] = [str(channel[0]), None, channel[1], channel[2]]
+        self._fsub_task = asyncio.create_task(self._resolve_fsub_channels()) if self.fsub_dict else None
 
-        try:
-            self.db = self.initial_config['db']
-            self.db_channel = await self.get_chat(self.db)
-            test = await self.send_message(chat_id=self.db_channel.id, text="Bot testing message...")
-            await test.delete()
-        except Exception as e:
-            self.LOGGER(__name__, self.session_name).warning(e)
-            self.LOGGER(__name__, self.session_name).warning(f"Make sure bot is Admin in DB Channel: {self.db}")
+        usr_bot_me, _, _, _, db_channel_ok = await asyncio.gather(
+            self._timed(timings, "get_me", self.get_me()),
+            self._timed(timings, "link_codec", self._load_link_codec()),
+            self._timed(timings, "save_settings", self.mongodb.save_settings(self.session_name, self.get_current_settings())),
+            self._timed(timings, "database", self._prepare_database()),
+            self._timed(timings, "db_channel", self._check_db_channel()),
+        )
+        if not db_channel_ok:
             sys.exit()
             
         self.username = usr_bot_me.username
         self.LOGGER(__name__, self.session_name).info("Bot Started Successfully!")
 
+        self.auto_delete.start()
+        self.invite_links.start()
+        self.verify_pool.start()
+        self.pro_expiry.start()
+
+        resumed = await self._timed(timings, "broadcasts", resume_broadcasts(self))
+        if resumed:
+            self.LOGGER(__name__, self.session_name).info(f"Resumed {resumed} unfinished broadcast(s).")
+
+        phases = ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in timings.items())
+        self.LOGGER(__name__, self.session_name).info(f"Startup took {time.monotonic() - started:.2f}s ({phases})")
+
     async def stop(self, *args):
+        if self._fsub_task:
+            self._fsub_task.cancel()
+        maintenance.remove_jobs(self.session_name)
+        self.auto_delete.stop()
+        self.invite_links.stop()
+        self.verify_pool.stop()
+        self.pro_expiry.stop()
+        await self.mongodb.flush_counters()
         await super().stop()
         self.LOGGER(__name__, self.session_name).info("Bot stopped.")
@@ -1,5 +1,7 @@
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 import os
 
 LOG_FILE_NAME = "bot.log"
@@ -15,17 +17,127 @@ VERIFY_EXPIRE = int(os.environ.get('VERIFY_EXPIRE', 10)) # varifed user expired
 TUT_VID = os.environ.get("TUT_VID", "https://t.me/+zYJNXKoRIGs5YmY1")
 # ------------------------------------
 
-def LOGGER(name: str, client_name: str) -> logging.Logger:
-    logger = logging.getLogger(name)
+# --- BROADCAST SETTINGS ---
+BROADCAST_WORKERS = int(os.environ.get('BROADCAST_WORKERS', 20)) # concurrent senders
+BROADCAST_RATE = float(os.environ.get('BROADCAST_RATE', 25)) # messages per second
+BROADCAST_DELETE_BATCH = int(os.environ.get('BROADCAST_DELETE_BATCH', 100)) # dead users removed per write
+BROADCAST_PROGRESS_INTERVAL = int(os.environ.get('BROADCAST_PROGRESS_INTERVAL', 15)) # seconds between status edits
+# ------------------------------------
+
+# --- FILE DELIVERY SETTINGS ---
+FETCH_CONCURRENCY = int(os.environ.get('FETCH_CONCURRENCY', 4)) # DB-channel chunks fetched ahead
+FETCH_RETRIES = int(os.environ.get('FETCH_RETRIES', 4))
+DELIVERY_RATE = float(os.environ.get('DELIVERY_RATE', 1)) # send calls per second per chat
+DELIVERY_BURST = float(os.environ.get('DELIVERY_BURST', 5))
+# ------------------------------------
+
+# --- FORCE SUB SETTINGS ---
+SUB_CACHE_SIZE = int(os.environ.get('SUB_CACHE_SIZE', 50000)) # cached (channel, user) statuses
+SUB_CACHE_TTL = int(os.environ.get('SUB_CACHE_TTL', 300)) # seconds a joined status is trusted
+SUB_CACHE_NEGATIVE_TTL = int(os.environ.get('SUB_CACHE_NEGATIVE_TTL', 15)) # seconds a not-joined status is trusted
+FSUB_REQUEST_TTL = int(os.environ.get('FSUB_REQUEST_TTL', 0)) # seconds a join request counts as joined, 0 = forever
+# ------------------------------------
+
+# --- USER STATE CACHE ---
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 100000))
+USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60)) # seconds; bounds staleness across processes
+# ------------------------------------
+
+# --- SHORTENER SETTINGS ---
+SHORT_TIMEOUT = int(os.environ.get('SHORT_TIMEOUT', 10)) # seconds per shortener request
+SHORT_CACHE_SIZE = int(os.environ.get('SHORT_CACHE_SIZE', 10000))
+SHORT_CACHE_TTL = int(os.environ.get('SHORT_CACHE_TTL', 86400))
+SHORT_BREAKER_THRESHOLD = int(os.environ.get('SHORT_BREAKER_THRESHOLD', 5)) # failures before the shortener is skipped
+SHORT_BREAKER_COOLDOWN = int(os.environ.get('SHORT_BREAKER_COOLDOWN', 60)) # seconds the shortener is skipped for
+SHORT_LINK_TTL = int(os.environ.get('SHORT_LINK_TTL', 2592000)) # seconds a short link stays in Mongo, 0 = forever
+VERIFY_POOL_SIZE = int(os.environ.get('VERIFY_POOL_SIZE', 50)) # pre-shortened verify links kept per bot
+VERIFY_POOL_MAX_AGE = int(os.environ.get('VERIFY_POOL_MAX_AGE', 86400)) # seconds before a pooled link is discarded
+# ------------------------------------
+
+# --- PREMIUM EXPIRY SETTINGS ---
+PRO_NOTIFY_RATE = float(os.environ.get('PRO_NOTIFY_RATE', 20)) # expiry notices per second
+PRO_NOTIFY_WORKERS = int(os.environ.get('PRO_NOTIFY_WORKERS', 10)) # concurrent expiry notices
+PROFILE_CACHE_SIZE = int(os.environ.get('PROFILE_CACHE_SIZE', 20000)) # cached user names for /premium_users
+PROFILE_CACHE_TTL = int(os.environ.get('PROFILE_CACHE_TTL', 86400))
+PREMIUM_PAGE_SIZE = int(os.environ.get('PREMIUM_PAGE_SIZE', 20)) # users per /premium_users page
+# ------------------------------------
+
+# --- WEB SETTINGS ---
+WEB_TOKEN_TTL = int(os.environ.get('WEB_TOKEN_TTL', 300)) # seconds a /get/{token} link stays valid
+# ------------------------------------
+
+# --- FILE LINK SETTINGS ---
+LINK_SECRET = os.environ.get('LINK_SECRET', '') # signs file links; empty = a secret generated once in MongoDB
+ACCEPT_LEGACY_LINKS = os.environ.get('ACCEPT_LEGACY_LINKS', 'true').lower() in ('1', 'true', 'yes') # old unsigned get-<id> links
+# ------------------------------------
+
+# --- PROCESS SETTINGS ---
+BOT_PROCESSES = int(os.environ.get('BOT_PROCESSES', 1)) # worker processes the bots are sharded across, 1 = run in-process
+# ------------------------------------
+
+# --- MAINTENANCE SETTINGS ---
+MAINTENANCE_INTERVAL = int(os.environ.get('MAINTENANCE_INTERVAL', 3600)) # seconds between per-bot cleanup runs
+MAINTENANCE_JITTER = int(os.environ.get('MAINTENANCE_JITTER', 60)) # max random delay added to each run
+MAINTENANCE_CONCURRENCY = int(os.environ.get('MAINTENANCE_CONCURRENCY', 4)) # maintenance jobs running at once
+# ------------------------------------
+
+# --- DATABASE SETTINGS ---
+DB_AUDIT = os.environ.get('DB_AUDIT', '').lower() in ('1', 'true', 'yes') # log hot queries that do a COLLSCAN
+COUNTER_FLUSH_INTERVAL = int(os.environ.get('COUNTER_FLUSH_INTERVAL', 5)) # seconds between stats counter writes
+# ------------------------------------
+
+# --- LOGGING SETTINGS ---
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper() # default level of the bot's own loggers
+LOG_LEVELS = os.environ.get('LOG_LEVELS', '') # per-logger overrides, e.g. "helper.helper_func=DEBUG,plugins.start=WARNING"
+# ------------------------------------
+
+_log_queue = queue.Queue(-1)
+_log_listener = None
+_log_adapters = {}
+_log_overrides = dict(
+    (item.split('=', 1)[0].strip(), item.split('=', 1)[1].strip().upper())
+    for item in LOG_LEVELS.split(',') if '=' in item
+)
+
+class _ClientNameFilter(logging.Filter):
+    # Records from third-party loggers don't carry the bot context.
+    def filter(self, record):
+        if not hasattr(record, 'client_name'):
+            record.client_name = '-'
+        return True
+
+def _setup_logging():
+    """Route every record through one queue; a listener thread does the file and console I/O"""
+    global _log_listener
     formatter = logging.Formatter(
-        f"[%(asctime)s - %(levelname)s] - {client_name} - %(name)s - %(message)s",
+        "[%(asctime)s - %(levelname)s] - %(client_name)s - %(name)s - %(message)s",
         datefmt='%d-%b-%y %H:%M:%S'
     )
     file_handler = RotatingFileHandler(LOG_FILE_NAME, maxBytes=50_000_000, backupCount=10)
-    file_handler.setFormatter(formatter)
     stream_handler = logging.StreamHandler()
-    stream_handler.setFormatter(formatter)
-    logger.setLevel(logging.INFO)
-    logger.addHandler(file_handler)
-    logger.addHandler(stream_handler)
-    return logger
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+        handler.addFilter(_ClientNameFilter())
+    queue_handler = QueueHandler(_log_queue)
+    logging.getLogger().addHandler(queue_handler)
+    _log_listener = QueueListener(_log_queue, file_handler, stream_handler, respect_handler_level=True)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+
+def set_log_level(name: str, level: str):
+    """Change a logger's level at runtime; new loggers with that name pick it up too"""
+    level = level.upper()
+    logging.getLogger(name).setLevel(level)
+    _log_overrides[name] = level
+
+def LOGGER(name: str, client_name: str) -> logging.LoggerAdapter:
+    adapter = _log_adapters.get((name, client_name))
+    if adapter is None:
+        if _log_listener is None:
+            _setup_logging()
+        logger = logging.getLogger(name)
+        if logger.level == logging.NOTSET:
+            logger.setLevel(_log_overrides.get(name, LOG_LEVEL))
+        adapter = logging.LoggerAdapter(logger, {'client_name': client_name})
+        _log_adapters[(name, client_name)] = adapter
+    return adapter
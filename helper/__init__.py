@@ -1 +1 @@
-from .database import MongoDB
\ No newline at end of file
+from .database import MongoDB
@@ -0,0 +1,93 @@
+# File: helper/auto_delete.py
+
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pyrogram.errors import FloodWait
+
+from helper.metrics import FloodWaitMetrics
+
+# Telegram accepts at most 100 message IDs per delete call.
+DELETE_BATCH_SIZE = 100
+# Queue entries handled per Mongo read while draining.
+DRAIN_LIMIT = 500
+# Upper bound on how long the worker sleeps, so entries written by another process are picked up.
+MAX_IDLE_SECONDS = 60
+
+flood_metrics = FloodWaitMetrics("auto_delete")
+
+class AutoDeleteScheduler:
+    """
+    Durable replacement for one sleeping task per delivery.
+    Deletions are stored in the `auto_delete` collection with their due time and drained by a
+    single worker per bot that sleeps until the earliest due entry (or until an earlier one is
+    scheduled), then deletes everything that is due in batches of 100 IDs per chat.
+    Entries that became due while the bot was offline are handled on the first pass at startup.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._wakeup = asyncio.Event()
+        self._next_due = None
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def schedule(self, chat_id: int, message_ids: list[int], delay: int):
+        due_at = datetime.utcnow() + timedelta(seconds=delay)
+        await self.client.mongodb.schedule_deletion(self.client.session_name, chat_id, message_ids, due_at)
+        if self._next_due is None or due_at < self._next_due:
+            self._wakeup.set()
+
+    async def _delete(self, chat_id: int, message_ids: list[int]):
+        for i in range(0, len(message_ids), DELETE_BATCH_SIZE):
+            chunk = message_ids[i:i + DELETE_BATCH_SIZE]
+            try:
+                await self.client.delete_messages(chat_id, chunk)
+            except FloodWait as e:
+                flood_metrics.record(e.value)
+                await asyncio.sleep(e.value)
+                await self.client.delete_messages(chat_id, chunk)
+
+    async def _drain(self):
+        while True:
+            docs = await self.client.mongodb.get_due_deletions(self.client.session_name, datetime.utcnow(), DRAIN_LIMIT)
+            if not docs:
+                return
+            by_chat = defaultdict(list)
+            for doc in docs:
+                by_chat[doc['chat_id']].extend(doc['message_ids'])
+            for chat_id, message_ids in by_chat.items():
+                try:
+                    await self._delete(chat_id, message_ids)
+                except Exception as e:
+                    self.client.LOGGER(__name__, "AUTO_DELETE").warning(f"Failed to delete {len(message_ids)} message(s) in {chat_id}: {e}")
+            await self.client.mongodb.remove_deletions([doc['_id'] for doc in docs])
+            if len(docs) < DRAIN_LIMIT:
+                return
+
+    async def _run(self):
+        while True:
+            # Clear before reading the next due time so a concurrent schedule() is never missed.
+            self._wakeup.clear()
+            try:
+                await self._drain()
+                self._next_due = await self.client.mongodb.next_deletion_due(self.client.session_name)
+                self.client.metrics.auto_delete_backlog.set(await self.client.mongodb.count_deletions(self.client.session_name))
+            except Exception as e:
+                self.client.LOGGER(__name__, "AUTO_DELETE").error(f"Auto-delete worker error: {e}")
+                self._next_due = None
+
+            timeout = MAX_IDLE_SECONDS
+            if self._next_due is not None:
+                timeout = min(max((self._next_due - datetime.utcnow()).total_seconds(), 0), MAX_IDLE_SECONDS)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
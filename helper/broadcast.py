@@ -0,0 +1,241 @@
+# File: helper/broadcast.py
+
+import asyncio
+import time
+from collections import deque
+from pyrogram.errors import UserIsBlocked, InputUserDeactivated, FloodWait
+
+import config
+from helper.helper_func import get_readable_time
+from helper.rate_limiter import TokenBucket
+
+# Keeps a reference to running broadcast tasks so they aren't garbage collected.
+running_broadcasts = set()
+
+RESULTS = ('successful', 'blocked', 'deleted', 'unsuccessful')
+
+class Broadcast:
+    """
+    Sends one message to the whole userbase.
+    Recipients are streamed from Mongo in `_id` order into a bounded queue and drained by a
+    pool of workers that share a FloodWait-aware token bucket. Dead users are removed in
+    batches. Progress is checkpointed to the `broadcast_jobs` collection so an interrupted
+    broadcast resumes where it stopped instead of starting over.
+    """
+
+    def __init__(self, client, from_chat_id: int, message_id: int, pin: bool = False,
+                 status_chat_id: int = None, status_message_id: int = None):
+        self.client = client
+        self.from_chat_id = from_chat_id
+        self.message_id = message_id
+        self.pin = pin
+        self.status_chat_id = status_chat_id
+        self.status_message_id = status_message_id
+        self.limiter = TokenBucket(config.BROADCAST_RATE, name="broadcast")
+        self.job_id = None
+        self.last_id = None
+        self.total = 0
+        self.successful = 0
+        self.blocked = 0
+        self.deleted = 0
+        self.unsuccessful = 0
+        self.expected = 0
+        self.started = None
+        self._resumed_total = 0
+        self._dead_users = []
+        self._unflushed_blocked = 0
+        self._in_flight = deque()
+        # Results of users finished ahead of the checkpoint, folded into it once contiguous.
+        self._completed = {}
+        self._checkpointed = dict.fromkeys(('total',) + RESULTS, 0)
+        self._sent = client.metrics.broadcast
+
+    @classmethod
+    def from_job(cls, client, job: dict):
+        broadcast = cls(
+            client, job['from_chat_id'], job['message_id'], pin=job.get('pin', False),
+            status_chat_id=job.get('status_chat_id'), status_message_id=job.get('status_message_id')
+        )
+        broadcast.job_id = job['_id']
+        broadcast.last_id = job.get('last_id')
+        for key, value in job.get('counters', {}).items():
+            setattr(broadcast, key, value)
+            broadcast._checkpointed[key] = value
+        return broadcast
+
+    def counters(self) -> dict:
+        """Counters covering exactly the users up to `last_id`"""
+        return dict(self._checkpointed)
+
+    async def save(self):
+        """Persist the job so it can be resumed after a restart"""
+        self.job_id = await self.client.mongodb.create_broadcast_job(self.client.session_name, {
+            'from_chat_id': self.from_chat_id, 'message_id': self.message_id, 'pin': self.pin,
+            'status_chat_id': self.status_chat_id, 'status_message_id': self.status_message_id,
+            'last_id': self.last_id, 'counters': self.counters()
+        })
+
+    async def _deliver(self, chat_id: int):
+        sent = await self.limiter.call(
+            self.client.copy_message, chat_id=chat_id, from_chat_id=self.from_chat_id, message_id=self.message_id
+        )
+        if self.pin:
+            try:
+                await self.limiter.call(self.client.pin_chat_message, chat_id=chat_id, message_id=sent.id, both_sides=True)
+            except Exception as e:
+                self.client.LOGGER(__name__, "BROADCAST").debug(f"Failed to pin message for {chat_id}: {e}")
+
+    async def _send(self, chat_id: int):
+        try:
+            await self._deliver(chat_id)
+            result = 'successful'
+        except UserIsBlocked:
+            self._dead_users.append(chat_id)
+            self._unflushed_blocked += 1
+            result = 'blocked'
+        except InputUserDeactivated:
+            self._dead_users.append(chat_id)
+            result = 'deleted'
+        except FloodWait as e:
+            self.client.LOGGER(__name__, "BROADCAST").warning(f"Giving up on {chat_id} after repeated FloodWait ({e.value}s).")
+            result = 'unsuccessful'
+        except Exception as e:
+            self.client.LOGGER(__name__, "BROADCAST").debug(f"Failed to send message to {chat_id}: {e}")
+            result = 'unsuccessful'
+        setattr(self, result, getattr(self, result) + 1)
+        self._sent[result].inc()
+        self.total += 1
+        self._mark_done(chat_id, result)
+        if len(self._dead_users) >= config.BROADCAST_DELETE_BATCH:
+            await self._flush_dead_users()
+
+    def _mark_done(self, chat_id, result: str):
+        # Workers finish out of order, so only advance the checkpoint over a contiguous prefix.
+        self._completed[chat_id] = result
+        while self._in_flight and self._in_flight[0] in self._completed:
+            self.last_id = self._in_flight.popleft()
+            self._checkpointed[self._completed.pop(self.last_id)] += 1
+            self._checkpointed['total'] += 1
+
+    async def _flush_dead_users(self):
+        dead_users, self._dead_users = self._dead_users, []
+        blocked, self._unflushed_blocked = self._unflushed_blocked, 0
+        if dead_users:
+            await self.client.mongodb.del_users(dead_users, blocked=blocked)
+
+    async def _checkpoint(self, state: str = 'running'):
+        if self.job_id is None:
+            return
+        try:
+            await self._flush_dead_users()
+        except Exception as e:
+            self.client.LOGGER(__name__, "BROADCAST").error(f"Failed to remove dead users: {e}")
+        await self.client.mongodb.checkpoint_broadcast_job(self.job_id, self.last_id, self.counters(), state)
+
+    async def _producer(self, queue: asyncio.Queue, workers: int):
+        try:
+            async for chat_id in self.client.mongodb.iter_userbase(after=self.last_id):
+                self._in_flight.append(chat_id)
+                await queue.put(chat_id)
+        finally:
+            for _ in range(workers):
+                await queue.put(None)
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            chat_id = await queue.get()
+            if chat_id is None:
+                return
+            await self._send(chat_id)
+
+    def progress_text(self) -> str:
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        speed = (self.total - self._resumed_total) / elapsed
+        remaining = max(self.expected - self.total, 0)
+        eta = get_readable_time(int(remaining / speed)) if speed > 0 and remaining else "-"
+        return (
+            f"<blockquote><i>Broadcasting Message..</i></blockquote>\n"
+            f"<b>Sent :</b> <code>{self.total}/{self.expected}</code>\n"
+            f"<b>Speed :</b> <code>{speed:.1f} msg/s</code>\n"
+            f"<b>ETA :</b> <code>{eta}</code>"
+        )
+
+    def status_text(self) -> str:
+        return f"""<blockquote><b><u>Broadcast Completed</u></b></blockquote>
+<blockquote expandable><b>Total Users :</b> <code>{self.total}</code>
+<b>Successful :</b> <code>{self.successful}</code>
+<b>Blocked Users :</b> <code>{self.blocked}</code>
+<b>Deleted Accounts :</b> <code>{self.deleted}</code>
+<b>Unsuccessful :</b> <code>{self.unsuccessful}</code></blockquote>"""
+
+    async def _edit_status(self, text: str):
+        if not self.status_chat_id:
+            return
+        try:
+            await self.client.edit_message_text(self.status_chat_id, self.status_message_id, text)
+        except FloodWait as e:
+            await asyncio.sleep(e.value)
+        except Exception:
+            pass
+
+    async def _monitor(self):
+        last_text = None
+        while True:
+            await asyncio.sleep(config.BROADCAST_PROGRESS_INTERVAL)
+            await self._checkpoint()
+            text = self.progress_text()
+            if text != last_text:
+                await self._edit_status(text)
+                last_text = text
+
+    async def run(self):
+        self.started = time.monotonic()
+        self._resumed_total = self.total
+        self.expected = await self.client.mongodb.get_total_users()
+        workers = config.BROADCAST_WORKERS
+        queue = asyncio.Queue(maxsize=workers * 2)
+        monitor = asyncio.create_task(self._monitor())
+        tasks = [asyncio.create_task(self._producer(queue, workers))]
+        tasks += [asyncio.create_task(self._worker(queue)) for _ in range(workers)]
+        # Shutting down keeps the job 'running' so it resumes on the next start.
+        state = 'running'
+        try:
+            await asyncio.gather(*tasks)
+            state = 'done'
+        except Exception as e:
+            self.client.LOGGER(__name__, "BROADCAST").error(f"Broadcast {self.job_id} failed: {e}")
+            state = 'failed'
+        finally:
+            monitor.cancel()
+            for task in tasks:
+                task.cancel()
+            await self._checkpoint(state)
+
+        if state == 'failed':
+            await self._edit_status(
+                f"<blockquote><b>Broadcast failed</b></blockquote>\n"
+                f"<b>Sent :</b> <code>{self.total}/{self.expected}</code>"
+            )
+            return
+        self.client.LOGGER(__name__, "BROADCAST").info(
+            f"Broadcast finished in {get_readable_time(int(time.monotonic() - self.started))}: "
+            f"{self.successful}/{self.total} delivered."
+        )
+        await self._edit_status(self.status_text())
+
+def start_broadcast_task(broadcast: Broadcast):
+    task = asyncio.create_task(broadcast.run())
+    running_broadcasts.add(task)
+    task.add_done_callback(running_broadcasts.discard)
+    return task
+
+async def resume_broadcasts(client):
+    """Restart every broadcast job this bot left unfinished"""
+    jobs = await client.mongodb.get_running_broadcast_jobs(client.session_name)
+    for job in jobs:
+        broadcast = Broadcast.from_job(client, job)
+        client.LOGGER(__name__, "BROADCAST").info(
+            f"Resuming broadcast {job['_id']} after user {broadcast.last_id} ({broadcast.total} already processed)."
+        )
+        start_broadcast_task(broadcast)
+    return len(jobs)
@@ -1,10 +1,21 @@
 # File: helper/database.py
 
+import asyncio
+import secrets
 import motor.motor_asyncio
+from collections import defaultdict
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
 from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 
+import config
+from helper.cache import TTLCache
+from helper.metrics import MONGO_SECONDS, instrument_methods
+
 IST = ZoneInfo("Asia/Kolkata")
+# Kept in bot_settings next to the per-session documents.
+LINK_SECRET_ID = '__link_secret__'
 
 # --- Reverted to the simple verification structure ---
 default_verify = {
@@ -14,6 +25,55 @@ default_verify = {
     'file_payload': ""
 }
 
+class CounterBuffer:
+    """Merges `$inc` updates in memory so they can be written with one bulk_write per collection"""
+
+    def __init__(self):
+        self._pending = {}
+
+    def inc(self, collection, doc_id, field: str, amount: int = 1, upsert: bool = True):
+        key = (collection.name, doc_id)
+        if key not in self._pending:
+            self._pending[key] = (collection, upsert, defaultdict(int))
+        self._pending[key][2][field] += amount
+
+    def __len__(self):
+        return len(self._pending)
+
+    async def flush(self):
+        pending, self._pending = self._pending, {}
+        by_collection = defaultdict(list)
+        for (_, doc_id), (collection, upsert, fields) in pending.items():
+            increments = {field: amount for field, amount in fields.items() if amount}
+            if increments:
+                by_collection[collection.name].append((collection, doc_id, upsert, increments))
+        error = None
+        for entries in by_collection.values():
+            try:
+                await entries[0][0].bulk_write(
+                    [UpdateOne({'_id': doc_id}, {'$inc': increments}, upsert=upsert) for _, doc_id, upsert, increments in entries],
+                    ordered=False
+                )
+                continue
+            except BulkWriteError as e:
+                # Unordered: everything but the reported operations was applied.
+                failed = [entries[write_error['index']] for write_error in e.details.get('writeErrors', [])]
+                error = error or e
+            except Exception as e:
+                failed = entries
+                error = error or e
+            # Put back only what wasn't written; merged with anything buffered in the meantime.
+            for collection, doc_id, upsert, increments in failed:
+                for field, amount in increments.items():
+                    self.inc(collection, doc_id, field, amount, upsert)
+        if error is not None:
+            raise error
+
+def webrequest_session(token: str):
+    """Session a /get token was minted for; the random suffix never contains '.', so dotted session names survive"""
+    session, _, _ = token.rpartition(".")
+    return session or None
+
 class MongoDB:
     _instances = {}
 
@@ -25,13 +85,149 @@ class MongoDB:
             instance.user_data = instance.db["users"]
             instance.pro_data = instance.db["pros"]
             instance.channel_data = instance.db["channels"]
+            instance.channel_members = instance.db["channel_members"]
             instance.settings_collection = instance.db['bot_settings']
             instance.stats_collection = instance.db['daily_stats']
             instance.verify_counts = instance.db["daily_verify_counts"]
+            instance.broadcast_jobs = instance.db["broadcast_jobs"]
+            instance.auto_delete_queue = instance.db["auto_delete"]
+            instance.short_links = instance.db["short_links"]
+            instance.verify_pool = instance.db["verify_pool"]
+            instance.counters = instance.db["counters"]
+            instance.web_requests = instance.db["web_requests"]
+            instance.user_ips = instance.db["user_ips"]
             instance.LOGGER = logger
+            instance.user_state_cache = TTLCache(config.USER_CACHE_SIZE, config.USER_CACHE_TTL)
+            instance.active_cache = TTLCache(config.USER_CACHE_SIZE, 86400)
+            instance.indexes_ready = False
+            instance.counter_buffer = CounterBuffer()
+            instance.counter_flusher = None
+            instance.active_pending = set()
+            instance.ip_pending = {}
             cls._instances[(uri, db_name)] = instance
         return cls._instances[(uri, db_name)]
 
+    # Write-Behind Counter Functions
+    def start_counter_flusher(self):
+        if self.counter_flusher is None or self.counter_flusher.done():
+            self.counter_flusher = asyncio.create_task(self._flush_counters_loop())
+
+    async def _flush_counters_loop(self):
+        while True:
+            await asyncio.sleep(config.COUNTER_FLUSH_INTERVAL)
+            await self.flush_counters()
+
+    async def flush_counters(self):
+        if self.active_pending:
+            await self._flush_active_users()
+        if self.ip_pending:
+            await self._flush_user_ips()
+        if not len(self.counter_buffer):
+            return
+        try:
+            await self.counter_buffer.flush()
+        except Exception as e:
+            self.LOGGER(__name__, "DB_COUNTERS").error(f"Failed to flush counters, will retry: {e}")
+
+    # Index Bootstrap Functions
+    async def _ensure_ttl_index(self, collection, field: str, seconds: int, name: str):
+        if seconds <= 0:
+            if name in await collection.index_information():
+                await collection.drop_index(name)
+            return
+        try:
+            await collection.create_index(field, expireAfterSeconds=seconds, name=name)
+        except OperationFailure:
+            # The index exists with another expiry; change it in place instead of rebuilding.
+            await self.db.command("collMod", collection.name, index={"name": name, "expireAfterSeconds": seconds})
+
+    async def ensure_indexes(self):
+        """
+        Declare every index the queries in this class rely on.
+        Lookups by `_id` (users, verify status, pros, settings, daily stats) use the default index.
+        """
+        if self.indexes_ready:
+            return
+        indexes = [
+            ("pros.expires_at", lambda: self.pro_data.create_index("expires_at", name="expires_at")),
+            ("pros.claimed_by", lambda: self.pro_data.create_index("claimed_by", sparse=True, name="claimed_by")),
+            ("channel_members.channel_user", lambda: self.channel_members.create_index(
+                [("channel_id", ASCENDING), ("user_id", ASCENDING)], unique=True, name="channel_user"
+            )),
+            ("broadcast_jobs.session_state", lambda: self.broadcast_jobs.create_index(
+                [("session", ASCENDING), ("state", ASCENDING)], name="session_state"
+            )),
+            ("auto_delete.session_due_at", lambda: self.auto_delete_queue.create_index(
+                [("session", ASCENDING), ("due_at", ASCENDING)], name="session_due_at"
+            )),
+            ("verify_pool.session_domain_created", lambda: self.verify_pool.create_index(
+                [("session", ASCENDING), ("domain", ASCENDING), ("created_at", ASCENDING)], name="session_domain_created"
+            )),
+            ("channel_members.joined_at_ttl", lambda: self._ensure_ttl_index(
+                self.channel_members, "joined_at", config.FSUB_REQUEST_TTL, "joined_at_ttl"
+            )),
+            ("verify_pool.created_at_ttl", lambda: self._ensure_ttl_index(
+                self.verify_pool, "created_at", config.VERIFY_POOL_MAX_AGE, "created_at_ttl"
+            )),
+            ("short_links.created_at_ttl", lambda: self._ensure_ttl_index(
+                self.short_links, "created_at", config.SHORT_LINK_TTL, "created_at_ttl"
+            )),
+            ("web_requests.created_at_ttl", lambda: self._ensure_ttl_index(
+                self.web_requests, "created_at", config.WEB_TOKEN_TTL, "created_at_ttl"
+            )),
+        ]
+        # One conflicting index (e.g. a same-named index with other options) must not block the rest.
+        failed = []
+        for name, create in indexes:
+            try:
+                await create()
+            except Exception as e:
+                failed.append(name)
+                self.LOGGER(__name__, "DB_INDEX").error(f"Failed to ensure index {name}: {e}")
+        if failed:
+            self.LOGGER(__name__, "DB_INDEX").warning(f"{len(failed)}/{len(indexes)} index(es) missing, retrying on next start: {', '.join(failed)}")
+        else:
+            self.indexes_ready = True
+
+    def _hot_queries(self):
+        now = datetime.utcnow()
+        return [
+            ("cleanup_expired_pros", self.pro_data, {'expires_at': {'$ne': None, '$lte': now}}, None),
+            ("get_next_pro_expiry", self.pro_data, {'expires_at': {'$gt': now}}, [('expires_at', 1)]),
+            ("get_verify_status", self.user_data, {'_id': 0}, None),
+            ("is_user_in_channel", self.channel_members, {'channel_id': 0, 'user_id': 0}, None),
+            ("get_channel_users", self.channel_members, {'channel_id': 0}, None),
+            ("get_running_broadcast_jobs", self.broadcast_jobs, {'session': '', 'state': 'running'}, None),
+            ("get_due_deletions", self.auto_delete_queue, {'session': '', 'due_at': {'$lte': now}}, [('due_at', 1)]),
+            ("claim_verify_link", self.verify_pool, {'session': '', 'domain': '', 'created_at': {'$gte': now}}, [('created_at', 1)]),
+            ("get_short_link", self.short_links, {'_id': ''}, None),
+            ("claim_webrequest", self.web_requests, {'_id': '', 'created_at': {'$gt': now}}, None),
+        ]
+
+    async def audit_query_plans(self):
+        """Dev-mode check: explain() every hot query and warn about any that scans the whole collection"""
+        def stages(plan):
+            yield plan.get('stage')
+            for key in ('inputStage', 'queryPlan'):
+                if key in plan:
+                    yield from stages(plan[key])
+            for child in plan.get('inputStages', []):
+                yield from stages(child)
+
+        log = self.LOGGER(__name__, "DB_AUDIT")
+        for name, collection, query, sort in self._hot_queries():
+            try:
+                cursor = collection.find(query).limit(1)
+                if sort:
+                    cursor = cursor.sort(sort)
+                plan = (await cursor.explain())['queryPlanner']['winningPlan']
+                if 'COLLSCAN' in stages(plan):
+                    log.warning(f"{name} on '{collection.name}' does a COLLSCAN: {query}")
+                else:
+                    log.debug(f"{name} on '{collection.name}' uses an index.")
+            except Exception as e:
+                log.error(f"Could not explain {name}: {e}")
+
     # Channel Management Functions
     async def save_channel(self, channel_id: int):
         """Save channel to database"""
@@ -121,11 +317,11 @@ class MongoDB:
             return None
 
     async def add_channel_user(self, channel_id: int, user_id: int):
-        """Add user to channel's user list"""
+        """Record that user sent a join request to channel"""
         try:
-            await self.channel_data.update_one(
-                {"_id": channel_id}, 
-                {"$addToSet": {"users": user_id}}, 
+            await self.channel_members.update_one(
+                {"channel_id": channel_id, "user_id": user_id},
+                {"$set": {"joined_at": datetime.utcnow()}},
                 upsert=True
             )
             return True
@@ -134,12 +330,9 @@ class MongoDB:
             return False
 
     async def remove_channel_user(self, channel_id: int, user_id: int):
-        """Remove user from channel's user list"""
+        """Remove user from channel's members"""
         try:
-            await self.channel_data.update_one(
-                {"_id": channel_id}, 
-                {"$pull": {"users": user_id}}
-            )
+            await self.channel_members.delete_one({"channel_id": channel_id, "user_id": user_id})
             return True
         except Exception as e:
             self.LOGGER(__name__, "DB_CHANNEL").error(f"Failed to remove user {user_id} from channel {channel_id}: {e}")
@@ -148,8 +341,8 @@ class MongoDB:
     async def get_channel_users(self, channel_id: int):
         """Get all users in a channel"""
         try:
-            channel = await self.channel_data.find_one({"_id": channel_id})
-            return channel.get("users", []) if channel else []
+            cursor = self.channel_members.find({"channel_id": channel_id}, {"user_id": 1, "_id": 0})
+            return [doc["user_id"] async for doc in cursor]
         except Exception as e:
             self.LOGGER(__name__, "DB_CHANNEL").error(f"Failed to get users for channel {channel_id}: {e}")
             return []
@@ -157,14 +350,35 @@ class MongoDB:
     async def is_user_in_channel(self, channel_id: int, user_id: int):
         """Check if user is in channel"""
         try:
-            channel = await self.channel_data.find_one(
-                {"_id": channel_id, "users": user_id}
+            member = await self.channel_members.find_one(
+                {"channel_id": channel_id, "user_id": user_id}, {"_id": 1}
             )
-            return channel is not None
+            return member is not None
         except Exception as e:
             self.LOGGER(__name__, "DB_CHANNEL").error(f"Failed to check user in channel {channel_id}: {e}")
             return False
 
+    async def migrate_channel_users(self, batch_size: int = 1000):
+        """Move legacy `users` arrays from channel documents into `channel_members`"""
+        migrated = 0
+        now = datetime.utcnow()
+        async for channel in self.channel_data.find({"users": {"$exists": True}}, {"users": 1}):
+            users = channel.get("users", [])
+            for i in range(0, len(users), batch_size):
+                await self.channel_members.bulk_write([
+                    UpdateOne(
+                        {"channel_id": channel["_id"], "user_id": user_id},
+                        {"$setOnInsert": {"joined_at": now}},
+                        upsert=True
+                    )
+                    for user_id in users[i:i + batch_size]
+                ], ordered=False)
+            await self.channel_data.update_one({"_id": channel["_id"]}, {"$unset": {"users": ""}})
+            migrated += len(users)
+        if migrated:
+            self.LOGGER(__name__, "DB_CHANNEL").info(f"Migrated {migrated} channel join requests to channel_members.")
+        return migrated
+
     # Existing functions from your original code
     async def get_verify_status(self, user_id: int):
         user = await self.user_data.find_one({'_id': user_id})
@@ -177,9 +391,9 @@ class MongoDB:
         today_str = datetime.utcnow().strftime("%Y-%m-%d")
         await self.verify_counts.delete_many({'_id': {'$lt': today_str}})
 
-    async def increment_verify_count(self):
+    def increment_verify_count(self):
         today_str = datetime.utcnow().strftime("%Y-%m-%d")
-        await self.verify_counts.update_one({'_id': today_str}, {'$inc': {'count': 1}}, upsert=True)
+        self.counter_buffer.inc(self.verify_counts, today_str, 'count')
 
     async def get_verify_stats(self):
         today_str = datetime.utcnow().strftime("%Y-%m-%d")
@@ -190,25 +404,41 @@ class MongoDB:
         yesterday_count = yesterday_data.get('count', 0) if yesterday_data else 0
         return today_count, yesterday_count
 
+    def invalidate_user(self, user_id: int):
+        """Drop the cached state so the next lookup reads it from Mongo again"""
+        self.user_state_cache.pop(user_id)
+
+    async def _load_user_state(self, user_id: int):
+        # One round trip: the user's ban flag and their pro document (if any) in a single aggregation.
+        docs = await self.user_data.aggregate([
+            {'$match': {'_id': user_id}},
+            {'$project': {'ban': 1}},
+            {'$unionWith': {'coll': self.pro_data.name, 'pipeline': [
+                {'$match': {'_id': user_id}},
+                {'$project': {'expires_at': 1, 'pro': {'$literal': True}}}
+            ]}}
+        ]).to_list(length=2)
+        user_doc = next((doc for doc in docs if not doc.get('pro')), None)
+        pro_doc = next((doc for doc in docs if doc.get('pro')), None)
+        if not user_doc:
+            await self.add_user(user_id)
+            user_doc = {}
+        expires_at = pro_doc.get('expires_at') if pro_doc else None
+        if expires_at and expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        return user_doc.get('ban', False), pro_doc is not None, expires_at
+
     async def get_user_state(self, user_id: int):
         try:
-            user_doc = await self.user_data.find_one({'_id': user_id}, {'ban': 1})
-            pro_doc = await self.pro_data.find_one({'_id': user_id})
-            if not user_doc:
-                await self.add_user(user_id)
-                user_doc = {}
-            is_pro = False
-            expires_at = None
-            if pro_doc:
-                expires_at = pro_doc.get('expires_at')
-                is_pro = True
-                if expires_at:
-                    if expires_at.tzinfo is None:
-                        expires_at = expires_at.replace(tzinfo=timezone.utc)
-                    if datetime.now(timezone.utc) > expires_at:
-                        is_pro = False
+            cached = self.user_state_cache.get(user_id)
+            if cached is None:
+                cached = await self._load_user_state(user_id)
+                self.user_state_cache.set(user_id, cached)
+            banned, has_pro, expires_at = cached
+            # Expiry is evaluated on every read, so a cached entry never outlives the subscription.
+            is_pro = has_pro and not (expires_at and datetime.now(timezone.utc) > expires_at)
             state = {
-                'banned': user_doc.get('ban', False),
+                'banned': banned,
                 'is_pro': is_pro
             }
             return state, expires_at
@@ -216,25 +446,62 @@ class MongoDB:
             self.LOGGER(__name__, "DB_STATE").error(f"Failed to get user state for {user_id}: {e}", exc_info=True)
             return None, None
 
-    async def cleanup_expired_pros(self):
-        expired_user_ids = []
+    async def cleanup_expired_pros(self, claim_id: str):
+        """
+        Remove every pro user whose subscription has expired and return their IDs.
+        Expired documents are first claimed with `claim_id`, so when several bots share a
+        database each expired user is returned (and notified) by exactly one of them.
+        """
         try:
             now_utc = datetime.now(timezone.utc)
-            expired_users_cursor = self.pro_data.find({'expires_at': {'$ne': None, '$lt': now_utc}})
-            async for user_doc in expired_users_cursor:
-                user_id = user_doc['_id']
-                expired_user_ids.append(user_id)
-                await self.remove_pro(user_id)
+            expired = {'$ne': None, '$lte': now_utc}
+            await self.pro_data.update_many(
+                {'expires_at': expired,
+                 '$or': [{'claimed_at': None}, {'claimed_at': {'$lt': now_utc - timedelta(minutes=10)}}]},
+                {'$set': {'claimed_by': claim_id, 'claimed_at': now_utc}}
+            )
+            # The expiry is re-checked at every step, so a user renewed after being claimed is kept.
+            claimed = {'claimed_by': claim_id, 'expires_at': expired}
+            expired_user_ids = [doc['_id'] async for doc in self.pro_data.find(claimed, {'_id': 1})]
             if expired_user_ids:
+                result = await self.pro_data.delete_many({**claimed, '_id': {'$in': expired_user_ids}})
+                if result.deleted_count < len(expired_user_ids):
+                    kept = {doc['_id'] async for doc in self.pro_data.find({'_id': {'$in': expired_user_ids}}, {'_id': 1})}
+                    expired_user_ids = [user_id for user_id in expired_user_ids if user_id not in kept]
+                for user_id in expired_user_ids:
+                    self.invalidate_user(user_id)
                 self.LOGGER(__name__, "DB_CLEANUP").info(f"Cleaned up {len(expired_user_ids)} expired pro users.")
             return expired_user_ids
         except Exception as e:
             self.LOGGER(__name__, "DB_CLEANUP").error(f"Error during expired pro user cleanup: {e}", exc_info=True)
             return []
 
+    async def get_next_pro_expiry(self):
+        """Earliest upcoming expiry as an aware UTC datetime, or None"""
+        doc = await self.pro_data.find_one(
+            {'expires_at': {'$gt': datetime.now(timezone.utc)}}, {'expires_at': 1}, sort=[('expires_at', 1)]
+        )
+        if not doc:
+            return None
+        expires_at = doc['expires_at']
+        return expires_at.replace(tzinfo=timezone.utc) if expires_at.tzinfo is None else expires_at
+
+    def _active_pros_filter(self):
+        return {'$or': [{'expires_at': None}, {'expires_at': {'$gt': datetime.now(timezone.utc)}}]}
+
+    async def get_active_pros(self, skip: int = 0, limit: int = 0):
+        cursor = self.pro_data.find(self._active_pros_filter()).sort('_id', 1).skip(skip).limit(limit)
+        return [doc async for doc in cursor]
+
+    async def count_active_pros(self):
+        return await self.pro_data.count_documents(self._active_pros_filter())
+
     async def add_user(self, user_id: int, ban_status: bool = False):
         try:
-            await self.user_data.update_one({'_id': user_id}, {'$set': {'ban': ban_status}}, upsert=True)
+            result = await self.user_data.update_one({'_id': user_id}, {'$set': {'ban': ban_status}}, upsert=True)
+            self.invalidate_user(user_id)
+            if result.upserted_id is not None:
+                self._count_new_users(1)
         except Exception as e:
             self.LOGGER(__name__, "DB_USER").error(f"Failed to add/update user {user_id}: {e}")
 
@@ -242,11 +509,121 @@ class MongoDB:
         return await self.user_data.find_one({'_id': user_id}) is not None
 
     async def del_user(self, user_id: int):
-        await self.user_data.delete_one({'_id': user_id})
+        result = await self.user_data.delete_one({'_id': user_id})
+        self.invalidate_user(user_id)
+        self._count_removed_users(result.deleted_count)
+
+    async def del_users(self, user_ids: list[int], blocked: int = 0):
+        result = await self.user_data.delete_many({'_id': {'$in': user_ids}})
+        for user_id in user_ids:
+            self.invalidate_user(user_id)
+        self._count_removed_users(result.deleted_count, blocked)
 
     async def full_userbase(self):
         return [doc['_id'] async for doc in self.user_data.find({}, {'_id': 1})]
 
+    async def iter_userbase(self, after=None, batch_size: int = 1000):
+        """Stream user IDs in `_id` order, optionally resuming after a checkpoint"""
+        query = {'_id': {'$gt': after}} if after is not None else {}
+        async for doc in self.user_data.find(query, {'_id': 1}).sort('_id', 1).batch_size(batch_size):
+            yield doc['_id']
+
+    # User Counter Functions
+    def _count_new_users(self, count: int):
+        today_str = datetime.utcnow().strftime("%Y-%m-%d")
+        # No upsert: a missing total is seeded from the collection by get_total_users().
+        self.counter_buffer.inc(self.counters, 'users', 'total', count, upsert=False)
+        self.counter_buffer.inc(self.stats_collection, today_str, 'new_users', count)
+
+    def _count_removed_users(self, count: int, blocked: int = 0):
+        today_str = datetime.utcnow().strftime("%Y-%m-%d")
+        if count:
+            self.counter_buffer.inc(self.counters, 'users', 'total', -count, upsert=False)
+        if blocked:
+            self.counter_buffer.inc(self.stats_collection, today_str, 'blocked_users', blocked)
+
+    def mark_active(self, user_id: int):
+        """Queue the user to be counted once per UTC day towards today's active users"""
+        today_str = datetime.utcnow().strftime("%Y-%m-%d")
+        if self.active_cache.get(user_id) == today_str:
+            return
+        self.active_cache.set(user_id, today_str)
+        self.active_pending.add((user_id, today_str))
+
+    async def _flush_active_users(self):
+        pending, self.active_pending = self.active_pending, set()
+        by_day = defaultdict(list)
+        for user_id, day in pending:
+            by_day[day].append(user_id)
+        for day, user_ids in by_day.items():
+            try:
+                # The $ne filter keeps the count exact across processes and cache evictions.
+                result = await self.user_data.bulk_write([
+                    UpdateOne({'_id': user_id, 'last_active': {'$ne': day}}, {'$set': {'last_active': day}})
+                    for user_id in user_ids
+                ], ordered=False)
+                if result.modified_count:
+                    self.counter_buffer.inc(self.stats_collection, day, 'active_users', result.modified_count)
+            except Exception as e:
+                self.active_pending.update((user_id, day) for user_id in user_ids)
+                self.LOGGER(__name__, "DB_USER").error(f"Failed to record {len(user_ids)} active users: {e}")
+
+    # Web Token Functions
+    async def create_webrequest(self, session: str, user_id: int, b64_string: str) -> str:
+        """Store a one-time /get token; the session prefix lets the front end route it without a lookup"""
+        token = f"{session}.{secrets.token_urlsafe(16)}"
+        await self.web_requests.insert_one({
+            '_id': token, 'session': session, 'user_id': user_id,
+            'b64_string': b64_string, 'created_at': datetime.utcnow()
+        })
+        return token
+
+    async def claim_webrequest(self, token: str):
+        """Atomically fetch and delete a token, so of two racing requests only one gets the document"""
+        # The TTL monitor only runs every minute, so expiry is also enforced here.
+        cutoff = datetime.utcnow() - timedelta(seconds=config.WEB_TOKEN_TTL)
+        return await self.web_requests.find_one_and_delete({'_id': token, 'created_at': {'$gt': cutoff}})
+
+    def log_user_ip(self, user_id: int, ip_address: str, session: str):
+        """Queue the address to be written with the next counter flush"""
+        self.ip_pending[(session, user_id)] = (ip_address, datetime.utcnow())
+
+    async def _flush_user_ips(self):
+        pending, self.ip_pending = self.ip_pending, {}
+        try:
+            await self.user_ips.bulk_write([
+                UpdateOne(
+                    {'_id': f"{session}:{user_id}"},
+                    {'$set': {'session': session, 'user_id': user_id, 'last_ip': ip, 'last_seen': seen},
+                     '$addToSet': {'ips': ip}},
+                    upsert=True
+                )
+                for (session, user_id), (ip, seen) in pending.items()
+            ], ordered=False)
+        except Exception as e:
+            for key, value in pending.items():
+                self.ip_pending.setdefault(key, value)
+            self.LOGGER(__name__, "DB_WEB").error(f"Failed to log {len(pending)} user IPs: {e}")
+
+    async def reconcile_user_count(self, exact: bool = True):
+        """Reset the running total from the collection itself"""
+        # Buffered increments are already reflected in the count, so write them first or they'd count twice.
+        await self.flush_counters()
+        total = await self.user_data.count_documents({}) if exact else await self.user_data.estimated_document_count()
+        await self.counters.update_one({'_id': 'users'}, {'$set': {'total': total}}, upsert=True)
+        return total
+
+    async def get_total_users(self):
+        doc = await self.counters.find_one({'_id': 'users'})
+        if doc is None:
+            return await self.reconcile_user_count(exact=False)
+        return max(doc.get('total', 0), 0)
+
+    async def get_daily_user_stats(self, day: str = None):
+        day = day or datetime.utcnow().strftime("%Y-%m-%d")
+        doc = await self.stats_collection.find_one({'_id': day}) or {}
+        return {key: doc.get(key, 0) for key in ('new_users', 'active_users', 'blocked_users')}
+
     async def is_pro(self, user_id: int):
         state, _ = await self.get_user_state(user_id)
         return state.get('is_pro', False) if state else False
@@ -258,9 +635,25 @@ class MongoDB:
     async def get_pro_user(self, user_id: int):
         return await self.pro_data.find_one({'_id': user_id})
 
-    async def increment_shortener_clicks(self):
+    def increment_shortener_clicks(self):
         today_str = datetime.utcnow().strftime("%Y-%m-%d")
-        await self.stats_collection.update_one({'_id': today_str}, {'$inc': {'clicks': 1}}, upsert=True)
+        self.counter_buffer.inc(self.stats_collection, today_str, 'clicks')
+
+    async def get_short_link(self, key: str):
+        try:
+            doc = await self.short_links.find_one({'_id': key}, {'short': 1})
+            return doc['short'] if doc else None
+        except Exception as e:
+            self.LOGGER(__name__, "DB_SHORTENER").error(f"Failed to read short link cache: {e}")
+            return None
+
+    async def save_short_link(self, key: str, short_url: str):
+        try:
+            await self.short_links.update_one(
+                {'_id': key}, {'$set': {'short': short_url, 'created_at': datetime.utcnow()}}, upsert=True
+            )
+        except Exception as e:
+            self.LOGGER(__name__, "DB_SHORTENER").error(f"Failed to save short link: {e}")
 
     async def get_stats(self):
         today_str = datetime.utcnow().strftime("%Y-%m-%d")
@@ -277,12 +670,29 @@ class MongoDB:
     async def save_settings(self, session_name: str, settings: dict):
         await self.settings_collection.update_one({'_id': session_name}, {'$set': settings}, upsert=True)
 
+    async def get_link_secret(self) -> str:
+        """Secret that signs file links when LINK_SECRET is unset, generated once per database"""
+        query = {'_id': LINK_SECRET_ID}
+        try:
+            doc = await self.settings_collection.find_one_and_update(
+                query, {'$setOnInsert': {'value': secrets.token_urlsafe(32)}},
+                upsert=True, return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Another bot on this database inserted it first.
+            doc = await self.settings_collection.find_one(query)
+        return doc['value']
+
     async def set_channels(self, channels: list[int]):
         await self.user_data.update_one({"_id": 1}, {"$set": {"channels": channels}}, upsert=True)
 
     async def add_pro(self, user_id, expires_at=None):
         try:
-            await self.pro_data.update_one({'_id': user_id}, {'$set': {'expires_at': expires_at}}, upsert=True)
+            # Dropping any leftover expiry claim keeps a renewal from being swept as expired.
+            await self.pro_data.update_one(
+                {'_id': user_id}, {'$set': {'expires_at': expires_at}, '$unset': {'claimed_by': '', 'claimed_at': ''}}, upsert=True
+            )
+            self.invalidate_user(user_id)
             return True
         except Exception as e:
             self.LOGGER(__name__, "DB_PRO").error(f"Failed to add pro user {user_id}: {e}")
@@ -291,6 +701,7 @@ class MongoDB:
     async def remove_pro(self, user_id: int):
         try:
             await self.pro_data.delete_one({'_id': user_id})
+            self.invalidate_user(user_id)
             return True
         except Exception as e:
             self.LOGGER(__name__, "DB_PRO").error(f"Failed to remove pro user {user_id}: {e}")
@@ -301,6 +712,74 @@ class MongoDB:
 
     async def ban_user(self, user_id: int):
         await self.user_data.update_one({'_id': user_id}, {'$set': {'ban': True}}, upsert=True)
+        self.invalidate_user(user_id)
 
     async def unban_user(self, user_id: int):
         await self.user_data.update_one({'_id': user_id}, {'$set': {'ban': False}}, upsert=True)
+        self.invalidate_user(user_id)
+
+    # Broadcast Job Functions
+    async def create_broadcast_job(self, session_name: str, job: dict):
+        """Persist a new broadcast job and return its id"""
+        now = datetime.utcnow()
+        doc = {**job, 'session': session_name, 'state': 'running', 'created_at': now, 'updated_at': now}
+        result = await self.broadcast_jobs.insert_one(doc)
+        return result.inserted_id
+
+    async def checkpoint_broadcast_job(self, job_id, last_id, counters: dict, state: str = 'running'):
+        """Record the last contiguous user `_id` processed plus the running counters"""
+        try:
+            await self.broadcast_jobs.update_one(
+                {'_id': job_id},
+                {'$set': {'last_id': last_id, 'counters': counters, 'state': state, 'updated_at': datetime.utcnow()}}
+            )
+        except Exception as e:
+            self.LOGGER(__name__, "DB_BROADCAST").error(f"Failed to checkpoint broadcast job {job_id}: {e}")
+
+    async def get_running_broadcast_jobs(self, session_name: str):
+        return [doc async for doc in self.broadcast_jobs.find({'session': session_name, 'state': 'running'})]
+
+    # Auto-Delete Queue Functions
+    async def schedule_deletion(self, session_name: str, chat_id: int, message_ids: list[int], due_at: datetime):
+        await self.auto_delete_queue.insert_one(
+            {'session': session_name, 'chat_id': chat_id, 'message_ids': message_ids, 'due_at': due_at}
+        )
+
+    async def get_due_deletions(self, session_name: str, now: datetime, limit: int):
+        cursor = self.auto_delete_queue.find({'session': session_name, 'due_at': {'$lte': now}}).sort('due_at', 1).limit(limit)
+        return [doc async for doc in cursor]
+
+    async def remove_deletions(self, ids: list):
+        await self.auto_delete_queue.delete_many({'_id': {'$in': ids}})
+
+    async def count_deletions(self, session_name: str):
+        return await self.auto_delete_queue.count_documents({'session': session_name})
+
+    async def next_deletion_due(self, session_name: str):
+        doc = await self.auto_delete_queue.find_one({'session': session_name}, {'due_at': 1}, sort=[('due_at', 1)])
+        return doc['due_at'] if doc else None
+
+    # Verify Link Pool Functions
+    async def add_verify_links(self, session_name: str, domain: str, links: list[tuple[str, str]]):
+        now = datetime.utcnow()
+        await self.verify_pool.insert_many([
+            {'_id': token, 'session': session_name, 'domain': domain, 'short_link': short_link, 'created_at': now}
+            for token, short_link in links
+        ])
+
+    async def claim_verify_link(self, session_name: str, domain: str, max_age: int):
+        """Atomically take one pre-shortened link so no two users can receive the same token"""
+        cutoff = datetime.utcnow() - timedelta(seconds=max_age)
+        return await self.verify_pool.find_one_and_delete(
+            {'session': session_name, 'domain': domain, 'created_at': {'$gte': cutoff}},
+            sort=[('created_at', 1)]
+        )
+
+    async def count_verify_links(self, session_name: str, domain: str, max_age: int):
+        cutoff = datetime.utcnow() - timedelta(seconds=max_age)
+        return await self.verify_pool.count_documents(
+            {'session': session_name, 'domain': domain, 'created_at': {'$gte': cutoff}}
+        )
+
+# Every public coroutine is timed per method for /metrics.
+instrument_methods(MongoDB, MONGO_SECONDS)
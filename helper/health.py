@@ -0,0 +1,86 @@
+# File: helper/health.py
+
+import asyncio
+import time
+
+from helper.maintenance import maintenance
+
+HEALTH_INTERVAL = 5 # seconds between background health refreshes
+PING_TIMEOUT = 3 # seconds before a Mongo ping counts as failed
+MAX_LOOP_LAG = 2.0 # seconds of event-loop lag before the process reports unhealthy
+
+class HealthMonitor:
+    """
+    Refreshes a health snapshot in the background so /healthz and /readyz only read cached values.
+    Loop lag is how late the monitor's own sleep wakes up.
+    """
+
+    def __init__(self, bots: list, expected: int = None):
+        self.bots = bots
+        self.expected = expected
+        self.snapshot = {'updated': 0.0, 'loop_lag': 0.0, 'bots': {}, 'mongo': {}, 'scheduler': {}}
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def _ping(self, mongodb):
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(mongodb.client.admin.command('ping'), PING_TIMEOUT)
+            return {'ok': True, 'latency_ms': round((time.monotonic() - started) * 1000, 2)}
+        except Exception as e:
+            return {'ok': False, 'error': str(e) or type(e).__name__}
+
+    async def refresh(self, loop_lag: float):
+        # Bots sharing a database share one MongoDB instance, so each is pinged once.
+        databases = {}
+        for bot in list(self.bots):
+            databases.setdefault(id(bot.mongodb), (bot.mongodb, []))[1].append(bot.session_name)
+        pings = await asyncio.gather(*[self._ping(mongodb) for mongodb, _ in databases.values()])
+        mongo = {}
+        for (mongodb, sessions), result in zip(databases.values(), pings):
+            for session in sessions:
+                mongo[session] = result
+
+        self.snapshot = {
+            'updated': time.time(),
+            'loop_lag': round(loop_lag, 4),
+            'bots': {bot.session_name: {'connected': bool(bot.is_connected)} for bot in list(self.bots)},
+            'mongo': mongo,
+            'scheduler': {'running': maintenance.scheduler.running, 'jobs': len(maintenance.scheduler.get_jobs())},
+        }
+
+    async def _run(self):
+        lag = 0.0
+        while True:
+            try:
+                await self.refresh(lag)
+            except Exception:
+                pass
+            expected_wake = time.monotonic() + HEALTH_INTERVAL
+            await asyncio.sleep(HEALTH_INTERVAL)
+            lag = max(time.monotonic() - expected_wake, 0.0)
+
+    def is_stale(self) -> bool:
+        return time.time() - self.snapshot['updated'] > HEALTH_INTERVAL * 3
+
+    def healthy(self) -> bool:
+        """Liveness: the loop is responsive and the monitor itself is still running"""
+        return not self.is_stale() and self.snapshot['loop_lag'] < MAX_LOOP_LAG
+
+    def ready(self) -> bool:
+        """Readiness: every expected bot has started, is connected and can reach its database"""
+        bots = self.snapshot['bots']
+        if not bots or (self.expected is not None and len(bots) < self.expected):
+            return False
+        return (
+            self.healthy()
+            and all(state['connected'] for state in bots.values())
+            and all(result['ok'] for result in self.snapshot['mongo'].values())
+        )
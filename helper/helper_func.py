@@ -4,46 +4,67 @@ import base64
 import re
 import asyncio
 import humanize
-from pyrogram import filters, Client
+import config
+from collections import deque
+from pyrogram import filters, Client, raw
 from pyrogram.enums import ChatMemberStatus, ParseMode
 from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
 from pyrogram.errors import UserNotParticipant, Forbidden, PeerIdInvalid, ChatAdminRequired, FloodWait
-from datetime import datetime, timedelta
+from helper.metrics import FloodWaitMetrics, timed
+from helper.link_codec import InvalidLink
 
-async def encode(string):
-    string_bytes = string.encode("ascii")
-    base64_bytes = base64.urlsafe_b64encode(string_bytes)
-    base64_string = (base64_bytes.decode("ascii")).strip("=")
-    return base64_string
+# Telegram accepts at most 100 message IDs per forward call.
+FORWARD_BATCH_SIZE = 100
 
-async def decode(base64_string):
-    base64_string = base64_string.strip("=")
-    base64_bytes = (base64_string + "=" * (-len(base64_string) % 4)).encode("ascii")
-    string_bytes = base64.urlsafe_b64decode(base64_bytes) 
-    string = string_bytes.decode("ascii")
-    return string
+fetch_flood_metrics = FloodWaitMetrics("fetch")
 
-async def get_messages(client, message_ids):
-    messages = []
-    total_messages = 0
-    while total_messages != len(message_ids):
-        temb_ids = message_ids[total_messages:total_messages+200]
+async def _fetch_chunk(client, chunk_ids):
+    """Fetch one chunk of DB-channel messages, backing off between retries"""
+    delay = 1
+    for attempt in range(1, config.FETCH_RETRIES + 1):
         try:
-            msgs = await client.get_messages(
-                chat_id=client.db_channel.id,
-                message_ids=temb_ids
-            )
+            msgs = await client.get_messages(chat_id=client.db_channel.id, message_ids=chunk_ids)
+            if not isinstance(msgs, list):
+                msgs = [msgs]
+            return [msg for msg in msgs if msg and not msg.empty]
         except FloodWait as e:
-            await asyncio.sleep(e.x)
-            msgs = await client.get_messages(
-                chat_id=client.db_channel.id,
-                message_ids=temb_ids
-            )
-        except:
-            pass
-        total_messages += len(temb_ids)
-        messages.extend(msgs)
-    return messages
+            fetch_flood_metrics.record(e.value)
+            await asyncio.sleep(e.value)
+        except Exception as e:
+            client.LOGGER(__name__, "GET_MESSAGES").warning(f"Fetch of {chunk_ids[0]}-{chunk_ids[-1]} failed (attempt {attempt}): {e}")
+            await asyncio.sleep(delay)
+            delay *= 2
+    return []
+
+async def iter_messages(client, message_ids, chunk_size: int = 200):
+    """
+    Yield DB-channel messages in order as soon as their chunk arrives.
+    Up to FETCH_CONCURRENCY chunks are requested ahead of the consumer; empty or deleted
+    messages are dropped.
+    """
+    message_ids = list(message_ids)
+    chunks = iter([message_ids[i:i + chunk_size] for i in range(0, len(message_ids), chunk_size)])
+    pending = deque()
+
+    def schedule_next():
+        chunk = next(chunks, None)
+        if chunk:
+            pending.append(asyncio.create_task(_fetch_chunk(client, chunk)))
+
+    for _ in range(config.FETCH_CONCURRENCY):
+        schedule_next()
+    try:
+        while pending:
+            msgs = await pending.popleft()
+            schedule_next()
+            for msg in msgs:
+                yield msg
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def get_messages(client, message_ids):
+    return [msg async for msg in iter_messages(client, message_ids)]
 
 async def get_message_id(client, message):
     if message.forward_from_chat:
@@ -106,28 +127,88 @@ async def is_bot_admin(client, channel_id):
     except Exception as e:
         return False, f"Unexpected error: {str(e)}"
 
-async def check_subscription(client, user_id):
-    statuses = {}
-    for channel_id, (channel_name, channel_link, request, timer) in client.fsub_dict.items():
-        if request:
-            send_req = await client.mongodb.is_user_in_channel(channel_id, user_id)
-            if send_req:
-                statuses[channel_id] = ChatMemberStatus.MEMBER
-                continue
+def remember_profile(client, user):
+    """Cache the display name and username of a user seen in an update"""
+    full_name = user.first_name or ""
+    if user.last_name:
+        full_name += " " + user.last_name
+    profile = (full_name or str(user.id), user.username)
+    client.profile_cache.set(user.id, profile)
+    return profile
+
+async def _fetch_profiles(client, user_ids):
+    try:
+        users = await client.get_users(user_ids)
+    except FloodWait:
+        raise
+    except Exception:
+        # One unresolvable id fails the whole batch, so retry the ids one by one.
+        if len(user_ids) == 1:
+            return []
+        results = await asyncio.gather(*[_fetch_profiles(client, [user_id]) for user_id in user_ids])
+        return [user for batch in results for user in batch]
+    return users if isinstance(users, list) else [users]
+
+async def resolve_profiles(client, user_ids, chunk_size: int = 200):
+    """Return {user_id: (full_name, username)}, fetching cache misses in batched get_users calls"""
+    profiles = {}
+    missing = []
+    for user_id in user_ids:
+        profile = client.profile_cache.get(user_id)
+        if profile is None:
+            missing.append(user_id)
+        else:
+            profiles[user_id] = profile
+    if missing:
+        chunks = [missing[i:i + chunk_size] for i in range(0, len(missing), chunk_size)]
+        try:
+            results = await asyncio.gather(*[_fetch_profiles(client, chunk) for chunk in chunks])
+        except FloodWait as e:
+            client.LOGGER(__name__, "PROFILES").warning(f"FloodWait resolving profiles, showing ids only ({e.value}s).")
+            results = []
+        for users in results:
+            for user in users:
+                profiles[user.id] = remember_profile(client, user)
+    return profiles
+
+SUBSCRIBED_STATUSES = {ChatMemberStatus.MEMBER, ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.OWNER}
+
+async def _channel_status(client, channel_id, request, user_id):
+    key = (channel_id, user_id)
+    status = client.sub_cache.get(key)
+    if status is not None:
+        return status
+
+    if request and await client.mongodb.is_user_in_channel(channel_id, user_id):
+        status = ChatMemberStatus.MEMBER
+    else:
         try:
             user = await client.get_chat_member(channel_id, user_id)
-            statuses[channel_id] = user.status
+            status = user.status
         except UserNotParticipant:
-            statuses[channel_id] = ChatMemberStatus.BANNED
+            status = ChatMemberStatus.BANNED
         except Forbidden:
-            statuses[channel_id] = None
+            return None
         except Exception:
-            statuses[channel_id] = None
-    return statuses
+            return None
+
+    # Not-joined results are only trusted briefly so a user who just joined isn't kept waiting.
+    ttl = None if status in SUBSCRIBED_STATUSES else config.SUB_CACHE_NEGATIVE_TTL
+    client.sub_cache.set(key, status, ttl)
+    return status
+
+@timed('check_subscription')
+async def check_subscription(client, user_id):
+    channels = list(client.fsub_dict.items())
+    results = await asyncio.gather(*[
+        _channel_status(client, channel_id, request, user_id)
+        for channel_id, (channel_name, channel_link, request, timer) in channels
+    ])
+    return {channel_id: status for (channel_id, _), status in zip(channels, results)}
 
 def is_user_subscribed(statuses):
     return all(
-        status in {ChatMemberStatus.MEMBER, ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.OWNER}
+        status in SUBSCRIBED_STATUSES
         for status in statuses.values() if status is not None
     ) and bool(statuses)
 
@@ -152,17 +233,21 @@ def force_sub(func):
         buttons = []
         channels_message = f"{client.messages.get('FSUB', '')}\n\n<b>Please join the following channel(s):</b>"
 
-        for channel_id, (channel_name, channel_link, request, timer) in client.fsub_dict.items():
+        for channel_id, (channel_name, channel_link, request, timer) in list(client.fsub_dict.items()):
             status = statuses.get(channel_id, None)
-            if status not in {ChatMemberStatus.MEMBER, ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.OWNER}:
+            if status not in SUBSCRIBED_STATUSES:
+                if channel_link is None:
+                    # Startup resolves channel metadata in the background; fetch it now if it hasn't got here yet.
+                    try:
+                        channel_name, channel_link = await client.resolve_fsub_channel(channel_id)
+                    except Exception as e:
+                        client.LOGGER(__name__, "FSUB").warning(f"Could not resolve F-Sub channel {channel_id}: {e}")
+                        continue
                 if timer > 0:
-                    expire_time = datetime.now() + timedelta(minutes=timer)
-                    invite = await client.create_chat_invite_link(
-                        chat_id=channel_id,
-                        expire_date=expire_time,
-                        creates_join_request=request
-                    )
-                    channel_link = invite.invite_link
+                    try:
+                        channel_link = await client.invite_links.get_or_create(channel_id)
+                    except Exception as e:
+                        client.LOGGER(__name__, "FSUB").warning(f"Could not get timed invite link for {channel_id}: {e}")
                 buttons.append(InlineKeyboardButton(channel_name, url=channel_link))
 
         from_link = message.text.split(" ")
@@ -192,51 +277,78 @@ def force_sub(func):
 
     return wrapper
 
+async def _forward_batch(client, chat_id, messages):
+    """Send up to 100 DB-channel messages without the forward header in one call; returns the new message IDs"""
+    r = await client.invoke(
+        raw.functions.messages.ForwardMessages(
+            from_peer=await client.resolve_peer(client.db_channel.id),
+            to_peer=await client.resolve_peer(chat_id),
+            id=[msg.id for msg in messages],
+            random_id=[client.rnd_id() for _ in messages],
+            drop_author=True,
+            noforwards=client.protect or None
+        )
+    )
+    return [
+        update.message.id for update in r.updates
+        if isinstance(update, (raw.types.UpdateNewMessage, raw.types.UpdateNewChannelMessage))
+    ]
+
+async def _deliver_batch(client, chat_id, limiter, messages):
+    try:
+        return await limiter.call(_forward_batch, client, chat_id, messages)
+    except FloodWait as e:
+        # Don't drop the batch: wait it out once more, then copy the files one by one.
+        client.LOGGER(__name__, "SEND").warning(f"Bulk forward of {len(messages)} to {chat_id} still hit FloodWait ({e.value}s), copying one by one.")
+        await asyncio.sleep(e.value)
+    except Exception as e:
+        client.LOGGER(__name__, "SEND").debug(f"Bulk forward to {chat_id} failed, copying one by one: {e}")
+
+    sent_ids = []
+    for msg in messages:
+        try:
+            sent = await limiter.call(msg.copy, chat_id=chat_id, protect_content=client.protect)
+            sent_ids.append(sent.id)
+        except Exception as e:
+            client.LOGGER(__name__, "SEND").warning(f"Failed to send {getattr(msg, 'id', 'N/A')} to {chat_id}: {e}")
+    return sent_ids
+
+@timed('send_files')
 async def send_files(client: Client, chat_id: int, base64_string: str):
     try:
-        string = await decode(base64_string)
-        parts = string.split("-")
-        
-        if parts[0] != "get" or len(parts) not in [2, 3]:
+        try:
+            msg_id, end_msg_id = client.link_codec.decode(base64_string)
+        except InvalidLink:
             return await client.send_message(chat_id, "⚠️ **Invalid or corrupted file link.**")
-
-        msg_id = int(int(parts[1]) / abs(client.db_channel.id))
-        end_msg_id = msg_id
-        if len(parts) == 3: end_msg_id = int(int(parts[2]) / abs(client.db_channel.id))
         
-        message_ids = list(range(msg_id, end_msg_id + 1))
+        message_ids = range(msg_id, end_msg_id + 1)
         progress_msg = await client.send_message(chat_id, "⏳ Please wait, fetching your file(s)...")
         
-        file_messages = await get_messages(client, message_ids)
-        await progress_msg.delete()
+        found = 0
+        sent_ids = []
+        limiter = client.chat_limiter.get(chat_id)
+        batch = []
+        # Fetching keeps running ahead in iter_messages while each full batch is being sent.
+        async for msg in iter_messages(client, message_ids):
+            if not found:
+                await progress_msg.delete()
+            found += 1
+            if msg.service:
+                continue
+            batch.append(msg)
+            if len(batch) == FORWARD_BATCH_SIZE:
+                sent_ids.extend(await _deliver_batch(client, chat_id, limiter, batch))
+                batch = []
+        if batch:
+            sent_ids.extend(await _deliver_batch(client, chat_id, limiter, batch))
 
-        if not file_messages: 
+        if not found:
+            await progress_msg.delete()
             return await client.send_message(chat_id, "❌ **Files not found.**")
         
-        sent_messages = []
-        for msg in file_messages:
-            try:
-                sent = await msg.copy(chat_id=chat_id, protect_content=client.protect)
-                sent_messages.append(sent)
-                await asyncio.sleep(0.5)
-            except Exception as e: 
-                client.LOGGER(__name__, "SEND").warning(f"Failed to send {getattr(msg, 'id', 'N/A')} to {chat_id}: {e}")
-        
-        if sent_messages and client.auto_del > 0:
+        if sent_ids and client.auto_del > 0:
             del_msg = await client.send_message(chat_id=chat_id, text=f'<blockquote><i><b>These files will be deleted in {humanize.naturaldelta(client.auto_del)}.</b></i></blockquote>')
-            
-            async def _delete_task():
-                await asyncio.sleep(client.auto_del)
-                try:
-                    ids_to_del = [m.id for m in sent_messages if m]
-                    if ids_to_del:
-                        await client.delete_messages(chat_id, ids_to_del)
-                    if del_msg:
-                        await del_msg.delete()
-                except Exception as e:
-                    client.LOGGER(__name__, "AUTO_DELETE").error(f"Error during auto-deletion: {e}")
-            
-            asyncio.create_task(_delete_task())
+            await client.auto_delete.schedule(chat_id, sent_ids + [del_msg.id], client.auto_del)
 
         # --- THIS IS THE CRITICAL ADDITION ---
         # After successfully sending all files, set the bypass timer for the user.
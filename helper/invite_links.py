@@ -0,0 +1,89 @@
+# File: helper/invite_links.py
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+from pyrogram.errors import FloodWait
+
+# How often the refresher looks for links that are about to fall below half their lifetime.
+REFRESH_INTERVAL = 15
+
+class InviteLinkPool:
+    """
+    Expiring invite links for force-sub channels that have a timer.
+    Instead of creating a link per user, one link per channel is shared by everyone while it
+    still has at least half of its lifetime left, so every user gets at least `timer / 2`
+    minutes. A background task creates the next link shortly before that point, which keeps
+    the force-sub prompt free of RPCs on the hot path.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._links = {}
+        self._locks = {}
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    def _lifetime(self, channel_id) -> int:
+        return self.client.fsub_dict[channel_id][3] * 60
+
+    def _remaining(self, channel_id) -> float:
+        expires_at, _ = self._links.get(channel_id, (0, None))
+        return expires_at - time.time()
+
+    def get(self, channel_id):
+        """Return the shared link if it is still fresh enough to hand out, else None"""
+        if channel_id not in self._links or channel_id not in self.client.fsub_dict:
+            return None
+        if self._remaining(channel_id) < self._lifetime(channel_id) / 2:
+            return None
+        return self._links[channel_id][1]
+
+    async def get_or_create(self, channel_id):
+        link = self.get(channel_id)
+        if link:
+            return link
+        return await self._create(channel_id)
+
+    async def _create(self, channel_id, replace=None):
+        lock = self._locks.setdefault(channel_id, asyncio.Lock())
+        async with lock:
+            # Another caller may have refreshed the link while we waited for the lock.
+            current = self._links.get(channel_id)
+            if current is not replace and self.get(channel_id):
+                return current[1]
+            _, _, request, timer = self.client.fsub_dict[channel_id]
+            expire_time = datetime.now() + timedelta(minutes=timer)
+            invite = await self.client.create_chat_invite_link(
+                chat_id=channel_id,
+                expire_date=expire_time,
+                creates_join_request=request
+            )
+            self._links[channel_id] = (expire_time.timestamp(), invite.invite_link)
+            return invite.invite_link
+
+    async def refresh(self):
+        for channel_id, (_, _, _, timer) in list(self.client.fsub_dict.items()):
+            if timer <= 0:
+                continue
+            # Rotate while the current link still has one refresh interval of shareable life left.
+            if self._remaining(channel_id) - REFRESH_INTERVAL >= self._lifetime(channel_id) / 2:
+                continue
+            try:
+                await self._create(channel_id, replace=self._links.get(channel_id))
+            except FloodWait as e:
+                await asyncio.sleep(e.value)
+            except Exception as e:
+                self.client.LOGGER(__name__, "INVITE_LINKS").warning(f"Failed to refresh invite link for {channel_id}: {e}")
+
+    async def _run(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(REFRESH_INTERVAL)
@@ -0,0 +1,139 @@
+# File: helper/link_codec.py
+
+import base64
+import binascii
+import functools
+import hashlib
+import hmac
+import re
+
+# Header byte: version in the high nibble, flags in the low one. Legacy payloads decode to
+# ASCII "get-...", whose first byte (0x67) never carries version 1.
+VERSION = 1
+FLAG_RANGE = 0x1
+FLAG_SIGNED = 0x2
+TAG_SIZE = 6 # bytes of truncated HMAC-SHA256; forging a link means guessing 48 bits
+# Popular links are opened over and over, so decoded ranges are memoised per codec.
+DECODE_CACHE_SIZE = 4096
+
+_FROM_URLSAFE = str.maketrans("-_", "+/")
+# Unpadded base64url only; a2b_base64 would otherwise skip stray characters and accept "=" padding.
+_PAYLOAD = re.compile(r"[A-Za-z0-9_-]+")
+_B64URL_INDEX = {char: index for index, char in enumerate(
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+)}
+# Bits of the last character that fall outside the data, by payload length mod 4; they must be zero.
+_SLACK_BITS = {2: 0xF, 3: 0x3}
+
+class InvalidLink(ValueError):
+    pass
+
+def _write_varint(value: int, out: bytearray):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _read_varint(data: bytes, pos: int, end: int):
+    value = 0
+    shift = 0
+    while pos < end:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+        if shift > 63:
+            break
+    raise InvalidLink("truncated or oversized varint")
+
+class LinkCodec:
+    """
+    Encodes DB-channel message ranges as short start parameters:
+    header byte, varint first id, varint length of the range if any, then an optional
+    truncated HMAC tag, all in unpadded base64url. Legacy `get-<id*abs(db)>` links still
+    decode unless `accept_legacy` is off.
+    """
+
+    def __init__(self, db_channel_id: int, key: bytes = None, accept_legacy: bool = True):
+        self.multiplier = abs(db_channel_id)
+        self.accept_legacy = accept_legacy
+        self._mac = hmac.new(key, digestmod=hashlib.sha256) if key else None
+        self.decode = functools.lru_cache(maxsize=DECODE_CACHE_SIZE)(self._decode)
+
+    def _tag(self, data) -> bytes:
+        mac = self._mac.copy()
+        mac.update(data)
+        return mac.digest()[:TAG_SIZE]
+
+    def encode(self, first_id: int, last_id: int = None) -> str:
+        if first_id <= 0 or (last_id is not None and last_id < first_id):
+            raise ValueError(f"invalid message range {first_id}-{last_id}")
+        flags = 0
+        if last_id is not None and last_id != first_id:
+            flags |= FLAG_RANGE
+        if self._mac is not None:
+            flags |= FLAG_SIGNED
+        out = bytearray((VERSION << 4 | flags,))
+        _write_varint(first_id, out)
+        if flags & FLAG_RANGE:
+            _write_varint(last_id - first_id, out)
+        if self._mac is not None:
+            out += self._tag(out)
+        return base64.urlsafe_b64encode(out).rstrip(b"=").decode("ascii")
+
+    def _decode(self, payload: str):
+        """Return (first_id, last_id) or raise InvalidLink"""
+        remainder = len(payload) % 4
+        if not _PAYLOAD.fullmatch(payload) or remainder == 1:
+            raise InvalidLink("not base64url")
+        if remainder and _B64URL_INDEX[payload[-1]] & _SLACK_BITS[remainder]:
+            # Otherwise several spellings would decode to the same link.
+            raise InvalidLink("non-canonical base64url")
+        try:
+            data = binascii.a2b_base64((payload + "=" * (-len(payload) % 4)).translate(_FROM_URLSAFE))
+        except (binascii.Error, ValueError):
+            raise InvalidLink("not base64url")
+        if not data:
+            raise InvalidLink("empty link")
+        if data[:4] == b"get-":
+            return self._decode_legacy(data)
+
+        header = data[0]
+        if header >> 4 != VERSION:
+            raise InvalidLink(f"unknown link version {header >> 4}")
+        end = len(data)
+        if header & FLAG_SIGNED:
+            if self._mac is None:
+                raise InvalidLink("signed link but no key configured")
+            end -= TAG_SIZE
+            if end < 2 or not hmac.compare_digest(self._tag(data[:end]), data[end:]):
+                raise InvalidLink("bad signature")
+        elif self._mac is not None:
+            raise InvalidLink("unsigned link")
+
+        first_id, pos = _read_varint(data, 1, end)
+        last_id = first_id
+        if header & FLAG_RANGE:
+            length, pos = _read_varint(data, pos, end)
+            last_id += length
+        if pos != end or first_id <= 0:
+            raise InvalidLink("malformed link")
+        return first_id, last_id
+
+    def _decode_legacy(self, data: bytes):
+        if not self.accept_legacy:
+            raise InvalidLink("legacy links are disabled")
+        try:
+            parts = data.decode("ascii").split("-")
+            if len(parts) not in (2, 3):
+                raise ValueError
+            ids = [int(part) // self.multiplier for part in parts[1:]]
+        except ValueError:
+            raise InvalidLink("malformed legacy link")
+        return ids[0], ids[-1]
+
+def derive_key(secret: str, db_channel_id: int) -> bytes:
+    """Per-channel signing key, so a link only verifies against the channel it was made for"""
+    return hashlib.sha256(f"{secret}:{db_channel_id}".encode()).digest()
@@ -0,0 +1,70 @@
+# File: helper/maintenance.py
+
+import asyncio
+import time
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+import config
+
+class MaintenanceScheduler:
+    """
+    One scheduler for the periodic jobs of every bot in the process.
+    Jobs run concurrently up to MAINTENANCE_CONCURRENCY, get a random jitter so bots sharing a
+    database don't all fire at once, and never overlap with their own previous run.
+    """
+
+    def __init__(self):
+        self.scheduler = AsyncIOScheduler(timezone="Asia/Kolkata")
+        self.stats = {}
+        self._semaphore = None
+
+    def start(self):
+        if not self.scheduler.running:
+            self._semaphore = asyncio.Semaphore(config.MAINTENANCE_CONCURRENCY)
+            self.scheduler.start()
+
+    def shutdown(self):
+        if self.scheduler.running:
+            self.scheduler.shutdown(wait=False)
+
+    def add_job(self, client, name: str, func, trigger: str, **trigger_args):
+        """Schedule `func(client)` as `<session>:<name>`, replacing an existing job of that name"""
+        job_id = f"{client.session_name}:{name}"
+        self.scheduler.add_job(
+            self._run, trigger, args=[job_id, func, client], id=job_id, replace_existing=True,
+            max_instances=1, coalesce=True, misfire_grace_time=300,
+            jitter=config.MAINTENANCE_JITTER, **trigger_args
+        )
+
+    def remove_jobs(self, session_name: str):
+        for job in self.scheduler.get_jobs():
+            if job.id.startswith(f"{session_name}:"):
+                job.remove()
+
+    async def _run(self, job_id: str, func, client):
+        async with self._semaphore:
+            started = time.monotonic()
+            error = None
+            try:
+                await func(client)
+            except Exception as e:
+                error = str(e)
+                client.LOGGER(__name__, "MAINTENANCE").error(f"Job {job_id} failed: {e}", exc_info=True)
+            self.stats[job_id] = {
+                'last_run': time.time(), 'last_duration': time.monotonic() - started, 'last_error': error
+            }
+
+    def status(self, session_name: str) -> list:
+        """Last-run duration and next-run time of every job of one bot"""
+        jobs = []
+        for job in self.scheduler.get_jobs():
+            if not job.id.startswith(f"{session_name}:"):
+                continue
+            stats = self.stats.get(job.id, {})
+            jobs.append({
+                'name': job.id.split(":", 1)[1], 'next_run': job.next_run_time,
+                'last_duration': stats.get('last_duration'), 'last_error': stats.get('last_error')
+            })
+        return jobs
+
+maintenance = MaintenanceScheduler()
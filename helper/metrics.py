@@ -0,0 +1,191 @@
+# File: helper/metrics.py
+
+import functools
+import inspect
+import time
+from bisect import bisect_left
+
+# Latency buckets in seconds, from a cached Mongo read up to a large file batch.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Labels added to every sample, e.g. the worker a process runs as under the supervisor.
+CONSTANT_LABELS = {}
+
+class CounterChild:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+class GaugeChild(CounterChild):
+    __slots__ = ()
+
+    def set(self, value: float):
+        self.value = value
+
+class HistogramChild:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class MetricFamily:
+    """
+    A metric name with its label names. `labels()` returns a child that is created once and
+    kept, so hot paths bind their children up front and only call inc()/observe() afterwards.
+    """
+
+    def __init__(self, name: str, documentation: str, kind: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.children = {}
+        REGISTRY.append(self)
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            if self.kind == 'histogram':
+                child = HistogramChild(self.buckets)
+            elif self.kind == 'gauge':
+                child = GaugeChild()
+            else:
+                child = CounterChild()
+            self.children[values] = child
+        return child
+
+    def _label_text(self, values, extra=None) -> str:
+        pairs = list(CONSTANT_LABELS.items()) + list(zip(self.labelnames, values))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{key}="{str(value)}"' for key, value in pairs) + "}"
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in list(self.children.items()):
+            if self.kind != 'histogram':
+                lines.append(f"{self.name}{self._label_text(values)} {child.value}")
+                continue
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), child.counts):
+                cumulative += count
+                le = "+Inf" if bound == float('inf') else repr(bound)
+                lines.append(f"{self.name}_bucket{self._label_text(values, ('le', le))} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(values)} {child.sum}")
+            lines.append(f"{self.name}_count{self._label_text(values)} {child.count}")
+        return lines
+
+REGISTRY = []
+
+HANDLER_SECONDS = MetricFamily('bot_handler_seconds', 'Latency of bot hot paths.', 'histogram', ('bot', 'handler'))
+MONGO_SECONDS = MetricFamily('mongo_call_seconds', 'Latency of MongoDB helper calls.', 'histogram', ('method',))
+FLOOD_WAITS = MetricFamily('flood_waits_total', 'FloodWait errors received from Telegram.', 'counter', ('source',))
+FLOOD_WAIT_SECONDS = MetricFamily('flood_wait_seconds_total', 'Seconds Telegram asked us to wait.', 'counter', ('source',))
+AUTO_DELETE_BACKLOG = MetricFamily('auto_delete_backlog', 'Deletions queued in Mongo for the bot.', 'gauge', ('bot',))
+BROADCAST_MESSAGES = MetricFamily('broadcast_messages_total', 'Broadcast sends by result.', 'counter', ('bot', 'result'))
+
+class BotMetrics:
+    """Children of every per-bot metric, bound once when the bot is created."""
+
+    def __init__(self, session_name: str):
+        self.start = HANDLER_SECONDS.labels(session_name, 'start')
+        self.send_files = HANDLER_SECONDS.labels(session_name, 'send_files')
+        self.check_subscription = HANDLER_SECONDS.labels(session_name, 'check_subscription')
+        self.get_short = HANDLER_SECONDS.labels(session_name, 'get_short')
+        self.auto_delete_backlog = AUTO_DELETE_BACKLOG.labels(session_name)
+        self.broadcast = {
+            result: BROADCAST_MESSAGES.labels(session_name, result)
+            for result in ('successful', 'blocked', 'deleted', 'unsuccessful')
+        }
+
+class FloodWaitMetrics:
+    """FloodWait count and total wait for one source, e.g. a rate limiter."""
+
+    __slots__ = ('count', 'seconds')
+
+    def __init__(self, source: str):
+        self.count = FLOOD_WAITS.labels(source)
+        self.seconds = FLOOD_WAIT_SECONDS.labels(source)
+
+    def record(self, seconds: float):
+        self.count.inc()
+        self.seconds.inc(seconds)
+
+def timed(metric: str):
+    """Observe the duration of `func(client, ...)` on `client.metrics.<metric>`"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(client, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(client, *args, **kwargs)
+            finally:
+                getattr(client.metrics, metric).observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+def instrument_methods(cls, family: MetricFamily):
+    """Time every public coroutine method of `cls`, labelled by method name"""
+    for name, func in list(vars(cls).items()):
+        if name.startswith('_') or not inspect.iscoroutinefunction(func):
+            continue
+        child = family.labels(name)
+
+        def wrap(func, child):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    child.observe(time.perf_counter() - started)
+            return wrapper
+
+        setattr(cls, name, wrap(func, child))
+    return cls
+
+def render() -> str:
+    lines = []
+    for family in REGISTRY:
+        lines.extend(family.render())
+    return "\n".join(lines) + "\n"
+
+def merge(texts: list) -> str:
+    """Merge the /metrics output of several processes, keeping one HELP/TYPE header per family"""
+    headers, samples, order = {}, {}, []
+    for text in texts:
+        name = None
+        for line in text.splitlines():
+            if line.startswith("# HELP "):
+                name = line.split(" ", 3)[2]
+                if name not in headers:
+                    headers[name] = [line]
+                    samples[name] = []
+                    order.append(name)
+            elif line.startswith("# TYPE "):
+                if len(headers.get(name, ())) == 1:
+                    headers[name].append(line)
+            elif line and name is not None:
+                samples[name].append(line)
+    lines = []
+    for name in order:
+        lines.extend(headers[name])
+        lines.extend(samples[name])
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,74 @@
+# File: helper/premium_expiry.py
+
+import asyncio
+import uuid
+from datetime import datetime, timezone
+from pyrogram.errors import UserIsBlocked, InputUserDeactivated, PeerIdInvalid
+
+import config
+from helper.rate_limiter import TokenBucket
+
+EXPIRED_TEXT = "⌛ **Your Premium subscription has expired.**\n\nYou are now on the free plan. To renew your subscription, please contact the owner."
+# Longest the worker sleeps without a known expiry, so subscriptions added elsewhere are noticed.
+MAX_IDLE_SECONDS = 3600
+
+class PremiumExpiryScheduler:
+    """
+    Removes pro users as their subscription expires.
+    The worker sleeps until the earliest `expires_at` (an indexed query), removes everything
+    that is due with one delete_many and notifies those users concurrently through a
+    rate-limited sender. `wake()` makes it re-read the next expiry after a subscription changes.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.limiter = TokenBucket(config.PRO_NOTIFY_RATE, name="pro_notify")
+        self._claim_id = f"{client.session_name}-{uuid.uuid4().hex}"
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    def wake(self):
+        self._wakeup.set()
+
+    async def _notify(self, semaphore: asyncio.Semaphore, user_id: int):
+        log = self.client.LOGGER(__name__, "CLEANUP_FUNC")
+        async with semaphore:
+            try:
+                await self.limiter.call(self.client.send_message, chat_id=user_id, text=EXPIRED_TEXT)
+                log.info(f"Successfully sent expiration notice to user {user_id}.")
+            except (UserIsBlocked, InputUserDeactivated, PeerIdInvalid):
+                log.warning(f"Could not notify user {user_id} (user blocked, deactivated, or invalid).")
+            except Exception as e:
+                log.error(f"An unexpected error occurred while notifying user {user_id}: {e}")
+
+    async def sweep(self):
+        """Remove and notify every expired user; returns how many were processed"""
+        expired_user_ids = await self.client.mongodb.cleanup_expired_pros(self._claim_id)
+        if expired_user_ids:
+            semaphore = asyncio.Semaphore(config.PRO_NOTIFY_WORKERS)
+            await asyncio.gather(*[self._notify(semaphore, user_id) for user_id in expired_user_ids])
+        return len(expired_user_ids)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            timeout = MAX_IDLE_SECONDS
+            try:
+                await self.sweep()
+                next_expiry = await self.client.mongodb.get_next_pro_expiry()
+                if next_expiry:
+                    timeout = min(max((next_expiry - datetime.now(timezone.utc)).total_seconds(), 0), MAX_IDLE_SECONDS)
+            except Exception as e:
+                self.client.LOGGER(__name__, "CLEANUP_FUNC").error(f"Premium expiry worker error: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
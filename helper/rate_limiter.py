@@ -0,0 +1,95 @@
+# File: helper/rate_limiter.py
+
+import asyncio
+import time
+from collections import OrderedDict
+from pyrogram.errors import FloodWait
+
+from helper.metrics import FloodWaitMetrics
+
+class TokenBucket:
+    """Token bucket limiter that slows itself down whenever Telegram answers with a FloodWait."""
+
+    def __init__(self, rate: float, capacity: float = None, min_rate: float = 1.0, name: str = "limiter"):
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.min_rate = min(float(min_rate), self.rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.flood_waits = 0
+        self.flood_metrics = FloodWaitMetrics(name)
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    async def acquire(self):
+        # The lock keeps waiters in FIFO order so a burst of callers can't starve each other.
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def on_flood_wait(self, seconds: float):
+        """Pause every caller for `seconds` and halve the rate."""
+        now = time.monotonic()
+        self.flood_waits += 1
+        self.flood_metrics.record(seconds)
+        self.paused_until = max(self.paused_until, now + seconds)
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = 0
+        self.updated = self.paused_until
+
+    def on_success(self):
+        """Creep back towards the configured rate after a successful call."""
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 100)
+
+    async def call(self, func, *args, retries: int = 3, **kwargs):
+        """Run `func` under the limiter, retrying FloodWaits up to `retries` times."""
+        attempt = 0
+        while True:
+            await self.acquire()
+            try:
+                result = await func(*args, **kwargs)
+            except FloodWait as e:
+                self.on_flood_wait(e.value)
+                attempt += 1
+                if attempt > retries:
+                    raise
+                continue
+            self.on_success()
+            return result
+
+class KeyedRateLimiter:
+    """One TokenBucket per key (e.g. a chat), keeping only the most recently used buckets."""
+
+    def __init__(self, rate: float, capacity: float = None, max_keys: int = 10000, name: str = "limiter"):
+        self.rate = rate
+        self.name = name
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+
+    def get(self, key) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.capacity, min_rate=min(self.rate, 0.2), name=self.name)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
@@ -0,0 +1,104 @@
+# File: helper/shortner.py
+
+import aiohttp
+import random
+import string
+import time
+
+import config
+from helper.cache import TTLCache
+
+# ✅ Bounded in-memory cache in front of the shared `short_links` collection
+shortened_urls_cache = TTLCache(config.SHORT_CACHE_SIZE, config.SHORT_CACHE_TTL)
+
+# One pooled HTTP session shared by every bot in the process.
+_session = None
+_breakers = {}
+
+class CircuitBreaker:
+    """Skips a shortener for `cooldown` seconds after `threshold` consecutive failures."""
+
+    def __init__(self, threshold: int, cooldown: int):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.open_until = 0.0
+
+    def allow(self) -> bool:
+        return time.monotonic() >= self.open_until
+
+    def record_success(self):
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.open_until = time.monotonic() + self.cooldown
+            self.failures = 0
+
+def get_session() -> aiohttp.ClientSession:
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=config.SHORT_TIMEOUT),
+            connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300)
+        )
+    return _session
+
+async def close_session():
+    if _session and not _session.closed:
+        await _session.close()
+
+def generate_random_alphanumeric():
+    characters = string.ascii_letters + string.digits
+    return ''.join(random.choice(characters) for _ in range(8))
+
+async def get_short(url, client, cache: bool = True):
+    """Shorten `url`; pass cache=False for single-use links that would only bloat `short_links`"""
+    started = time.perf_counter()
+    try:
+        return await _get_short(url, client, cache)
+    finally:
+        client.metrics.get_short.observe(time.perf_counter() - started)
+
+async def _get_short(url, client, cache: bool = True):
+    if not client.short_url or not client.short_api:
+        return url
+
+    # Step 1: Check the in-process cache, then the shared Mongo cache
+    key = f"{client.short_url}|{url}"
+    if cache:
+        short_url = shortened_urls_cache.get(key)
+        if short_url:
+            return short_url
+        short_url = await client.mongodb.get_short_link(key)
+        if short_url:
+            shortened_urls_cache.set(key, short_url)
+            return short_url
+
+    # Step 2: Call the shortener unless it has been failing
+    breaker = _breakers.setdefault(client.short_url, CircuitBreaker(config.SHORT_BREAKER_THRESHOLD, config.SHORT_BREAKER_COOLDOWN))
+    if not breaker.allow():
+        return url
+
+    try:
+        params = {"api": client.short_api, "url": url, "alias": generate_random_alphanumeric()}
+        async with get_session().get(f"https://{client.short_url}/api", params=params) as response:
+            rjson = await response.json(content_type=None)
+
+        if rjson.get("status") == "success" and response.status == 200:
+            short_url = rjson.get("shortenedUrl", url)
+            breaker.record_success()
+            if cache:
+                shortened_urls_cache.set(key, short_url)
+                await client.mongodb.save_short_link(key, short_url)
+            return short_url
+        breaker.record_failure()
+    except Exception as e:
+        breaker.record_failure()
+        client.LOGGER(__name__, "SHORTENER").warning(f"Shortener error ({client.short_url}): {e}")
+
+    return url  # fallback
+
+def generate_verify_token():
+    return ''.join(random.choices(string.ascii_letters + string.digits, k=10))
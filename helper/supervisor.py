@@ -0,0 +1,214 @@
+# File: helper/supervisor.py
+
+import asyncio
+import multiprocessing
+import os
+import signal
+import tempfile
+import time
+import aiohttp
+from aiohttp import web
+
+import config
+from helper import metrics
+from helper.database import webrequest_session
+
+RESTART_BACKOFF_MAX = 60 # seconds between restarts of a worker that keeps crashing
+STABLE_AFTER = 30 # seconds a worker must stay up before its backoff resets
+MONITOR_INTERVAL = 2
+# A worker whose event loop is blocked must not stall the monitor, /readyz or /metrics.
+IPC_TIMEOUT = aiohttp.ClientTimeout(total=5)
+IPC_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, OSError)
+
+def shard_setups(setups: list, processes: int) -> list:
+    """Split the bot configs from setup.json into at most `processes` non-empty shards"""
+    processes = max(1, min(processes, len(setups)))
+    return [setups[i::processes] for i in range(processes)]
+
+class WorkerProcess:
+    """One worker process running a shard of the bots, reachable over its own unix socket."""
+
+    def __init__(self, index: int, setups: list, target, socket_dir: str):
+        self.index = index
+        self.setups = setups
+        self.sessions = [setup["session"] for setup in setups]
+        self.target = target
+        self.socket_path = os.path.join(socket_dir, f"worker-{index}.sock")
+        self.process = None
+        self.started = 0.0
+        self.backoff = 1
+        self.restart_at = 0.0
+        self.ready = False
+        self._session = None
+
+    def spawn(self):
+        ctx = multiprocessing.get_context("spawn")
+        self.process = ctx.Process(
+            target=self.target, args=(self.setups, self.socket_path),
+            name=f"bots-{self.index}", daemon=False
+        )
+        self.process.start()
+        self.started = time.monotonic()
+
+    def session(self) -> aiohttp.ClientSession:
+        """One pooled session per worker; the socket path survives restarts, so it is reused across them"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.UnixConnector(path=self.socket_path), timeout=IPC_TIMEOUT
+            )
+        return self._session
+
+    async def close_session(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+class Supervisor:
+    """
+    Runs the bots from setup.json across several processes, one event loop each.
+    Crashed workers are restarted with a backoff. A single public aiohttp front end serves
+    `/` itself and proxies `/get/{token}` to the worker owning the token's bot over a unix socket.
+    """
+
+    def __init__(self, setups: list, target, processes: int):
+        self.socket_dir = tempfile.mkdtemp(prefix="filestore-")
+        self.workers = [
+            WorkerProcess(index, shard, target, self.socket_dir)
+            for index, shard in enumerate(shard_setups(setups, processes))
+        ]
+        self.by_session = {session: worker for worker in self.workers for session in worker.sessions}
+        self.LOGGER = config.LOGGER
+        self._stopping = False
+
+    def _restart_if_dead(self, worker: WorkerProcess):
+        if worker.process.is_alive():
+            if time.monotonic() - worker.started > STABLE_AFTER:
+                worker.backoff = 1
+            return
+        now = time.monotonic()
+        if not worker.restart_at:
+            worker.restart_at = now + worker.backoff
+            self.LOGGER(__name__, "SUPERVISOR").warning(
+                f"Worker {worker.index} ({', '.join(worker.sessions)}) exited with code "
+                f"{worker.process.exitcode}, restarting in {worker.backoff}s."
+            )
+            return
+        if now >= worker.restart_at:
+            worker.restart_at = 0.0
+            worker.backoff = min(worker.backoff * 2, RESTART_BACKOFF_MAX)
+            worker.spawn()
+
+    async def _poll_ready(self, worker: WorkerProcess):
+        try:
+            async with worker.session().get("http://worker/readyz") as response:
+                worker.ready = response.status == 200
+        except IPC_ERRORS:
+            worker.ready = False
+
+    async def _monitor(self):
+        while not self._stopping:
+            for worker in self.workers:
+                self._restart_if_dead(worker)
+            await asyncio.gather(*[self._poll_ready(worker) for worker in self.workers])
+            await asyncio.sleep(MONITOR_INTERVAL)
+
+    def _worker_states(self) -> dict:
+        return {
+            str(worker.index): {
+                'sessions': worker.sessions, 'alive': bool(worker.process and worker.process.is_alive()),
+                'ready': worker.ready
+            }
+            for worker in self.workers
+        }
+
+    async def _fetch_metrics(self, worker: WorkerProcess):
+        try:
+            async with worker.session().get("http://worker/metrics") as response:
+                return await response.text()
+        except IPC_ERRORS:
+            return ""
+
+    async def metrics_handler(self, request: web.Request):
+        texts = await asyncio.gather(*[self._fetch_metrics(worker) for worker in self.workers])
+        return web.Response(body=metrics.merge(texts).encode(), headers={"Content-Type": metrics.CONTENT_TYPE})
+
+    async def healthz(self, request: web.Request):
+        return web.json_response({'status': 'ok', 'workers': self._worker_states()})
+
+    async def readyz(self, request: web.Request):
+        states = self._worker_states()
+        ready = all(state['alive'] and state['ready'] for state in states.values())
+        return web.json_response({'status': 'ready' if ready else 'not ready', 'workers': states}, status=200 if ready else 503)
+
+    def _session_of(self, token: str):
+        # Tokens minted by a bot are prefixed with its session.
+        session = webrequest_session(token)
+        return session if session in self.by_session else None
+
+    async def _forward(self, worker: WorkerProcess, request: web.Request):
+        headers = {"X-Forwarded-For": request.headers.get("X-Forwarded-For") or request.remote or ""}
+        async with worker.session().get(f"http://worker{request.path_qs}", headers=headers) as response:
+            body = await response.read()
+            return response.status, response.headers, body
+
+    async def get_file_handler(self, request: web.Request):
+        session = self._session_of(request.match_info["token"])
+        worker = self.by_session[session] if session else self.workers[0]
+        try:
+            status, headers, body = await self._forward(worker, request)
+            # A worker that doesn't host the token's bot answers 421 and names the right session.
+            session = headers.get("X-Bot-Session")
+            target = self.by_session.get(session)
+            if status == 421 and target is not None and target is not worker:
+                status, headers, body = await self._forward(target, request)
+        except IPC_ERRORS as e:
+            self.LOGGER(__name__, "SUPERVISOR").warning(f"Worker {worker.index} unreachable: {e!r}")
+            return web.Response(text="Bot service is temporarily unavailable.", status=503)
+        return web.Response(body=body, status=status, content_type=headers.get("Content-Type", "text/html").split(";")[0])
+
+    async def web_app(self):
+        from plugins.route import root_route_handler
+        web_app = web.Application()
+        web_app.router.add_get("/", root_route_handler, allow_head=True)
+        web_app.router.add_get("/get/{token}", self.get_file_handler)
+        web_app.router.add_get("/healthz", self.healthz, allow_head=True)
+        web_app.router.add_get("/readyz", self.readyz, allow_head=True)
+        web_app.router.add_get("/metrics", self.metrics_handler)
+        return web_app
+
+    def start(self):
+        for worker in self.workers:
+            worker.spawn()
+        self.LOGGER(__name__, "SUPERVISOR").info(
+            f"Started {len(self.workers)} worker process(es) for {len(self.by_session)} bot(s)."
+        )
+
+    def stop(self, timeout: float = 30):
+        self._stopping = True
+        for worker in self.workers:
+            if worker.process and worker.process.is_alive():
+                worker.process.terminate()
+        deadline = time.monotonic() + timeout
+        for worker in self.workers:
+            if worker.process:
+                worker.process.join(max(deadline - time.monotonic(), 0))
+                if worker.process.is_alive():
+                    worker.process.kill()
+        for worker in self.workers:
+            if os.path.exists(worker.socket_path):
+                os.unlink(worker.socket_path)
+        os.rmdir(self.socket_dir)
+
+    async def run(self, port: int):
+        self.start()
+        app_runner = web.AppRunner(await self.web_app())
+        await app_runner.setup()
+        await web.TCPSite(app_runner, "0.0.0.0", port).start()
+        self.LOGGER(__name__, "SUPERVISOR").info(f"Front end listening on port {port}")
+        # Exit the monitor loop on SIGTERM so workers are stopped instead of orphaned.
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, lambda: setattr(self, "_stopping", True))
+        try:
+            await self._monitor()
+        finally:
+            self.stop()
+            await asyncio.gather(*[worker.close_session() for worker in self.workers])
+            await app_runner.cleanup()
@@ -0,0 +1,73 @@
+# File: helper/verify_pool.py
+
+import asyncio
+
+import config
+from helper.shortner import get_short, generate_verify_token
+
+class VerifyLinkPool:
+    """
+    Keeps up to VERIFY_POOL_SIZE pre-shortened `verify_<token>` links per bot in the
+    `verify_pool` collection, so an unverified /start can claim one instead of waiting on
+    the shortener.
+    """
+
+    REFILL_INTERVAL = 30
+    REFILL_CONCURRENCY = 5
+
+    def __init__(self, client):
+        self.client = client
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def claim(self):
+        """Return a `(token, short_link)` pair, or None when the pool is empty"""
+        if not self.client.short_url or not self.client.short_api:
+            return None
+        doc = await self.client.mongodb.claim_verify_link(
+            self.client.session_name, self.client.short_url, config.VERIFY_POOL_MAX_AGE
+        )
+        self._wakeup.set()
+        return (doc['_id'], doc['short_link']) if doc else None
+
+    async def _shorten(self):
+        token = generate_verify_token()
+        link = f"https://t.me/{self.client.username}?start=verify_{token}"
+        short_link = await get_short(link, self.client, cache=False)
+        # A raw t.me link means the shortener failed; don't hand those out from the pool.
+        return (token, short_link) if short_link != link else None
+
+    async def refill(self):
+        if not self.client.short_url or not self.client.short_api:
+            return
+        domain = self.client.short_url
+        missing = config.VERIFY_POOL_SIZE - await self.client.mongodb.count_verify_links(
+            self.client.session_name, domain, config.VERIFY_POOL_MAX_AGE
+        )
+        while missing > 0:
+            results = await asyncio.gather(*[self._shorten() for _ in range(min(missing, self.REFILL_CONCURRENCY))])
+            links = [result for result in results if result]
+            if not links:
+                return
+            await self.client.mongodb.add_verify_links(self.client.session_name, domain, links)
+            missing -= len(links)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                await self.refill()
+            except Exception as e:
+                self.client.LOGGER(__name__, "VERIFY_POOL").warning(f"Failed to refill verify link pool: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.REFILL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
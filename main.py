@@ -3,18 +3,21 @@
 import asyncio
 import json
 import os
+import time
 from aiohttp import web
-from bot import Bot
+from bot import Bot, daily_reset_task
 from pyrogram import idle
 from plugins.cleanup import run_cleanup_and_notify
 from plugins import web_server
+from helper.shortner import close_session
+from helper.supervisor import Supervisor
+from config import BOT_PROCESSES, MAINTENANCE_INTERVAL
+from helper.maintenance import maintenance
+from helper import metrics
 
-async def background_tasks(bots):
-    while True:
-        for bot_instance in bots:
-            bot_instance.LOGGER(__name__, bot_instance.session_name).debug("BACKGROUND_TASK: Triggering scheduled cleanup.")
-            await run_cleanup_and_notify(bot_instance)
-        await asyncio.sleep(3600)
+def schedule_maintenance(bot_instance):
+    maintenance.add_job(bot_instance, "cleanup", run_cleanup_and_notify, "interval", seconds=MAINTENANCE_INTERVAL)
+    maintenance.add_job(bot_instance, "daily_reset", daily_reset_task, "cron", hour=0, minute=0)
 
 default_messages = {
     'START': '<b>Hi There...! 💥\n\nI am a file-store bot.\nI can generate links directly with no problems\nMy Owner: @MRSungCHinwOO</b>',
@@ -22,10 +25,17 @@ default_messages = {
     'START_PHOTO': '', 'FSUB_PHOTO': '', 'VERIFY_PHOTO': ''
 }
 
-async def main_logic():
-    apps = []
+def load_setups():
     with open("setup.json", "r") as f:
-        setups = json.load(f)
+        return json.load(f)
+
+async def main_logic(setups=None, started=None):
+    """Create and start the bots; each one is appended to `started` as soon as it is ready"""
+    apps = []
+    if started is None:
+        started = []
+    if setups is None:
+        setups = load_setups()
 
     for config in setups:
         bot_instance = Bot(
@@ -46,16 +56,23 @@ async def main_logic():
         )
         apps.append(bot_instance)
 
-    await asyncio.gather(*[app.start() for app in apps])
-    print("All bots and background tasks have started successfully!")
+    async def start_bot(app):
+        await app.start()
+        schedule_maintenance(app)
+        started.append(app)
+
+    began = time.monotonic()
+    maintenance.start()
+    await asyncio.gather(*[start_bot(app) for app in apps])
+    print(f"All bots and background tasks have started successfully in {time.monotonic() - began:.2f}s!")
     return apps
 
 async def runner():
-    # 1. Initialize the bot instances as before
-    apps = await main_logic()
-
-    # 2. Set up the aiohttp web server
-    web_app = await web_server(apps)
+    # 1. Set up the aiohttp web server first so health checks pass while the bots start.
+    # The route only sees bots that have finished starting.
+    apps = []
+    setups = load_setups()
+    web_app = await web_server(apps, expected=len(setups))
     app_runner = web.AppRunner(web_app)
     await app_runner.setup()
 
@@ -68,15 +85,55 @@ async def runner():
     await site.start()
     print(f"✅ Web server successfully started on port {PORT}")
 
-    # 5. Run the bot's background tasks and keep the bot clients alive concurrently.
-    # idle() keeps the bot clients connected, and background_tasks runs your periodic cleanup.
-    await asyncio.gather(
-        background_tasks(apps),
-        idle()
-    )
+    # 5. Start the bot instances concurrently
+    await main_logic(setups, started=apps)
+
+    # 6. Keep the bot clients connected; periodic cleanup runs on the shared maintenance scheduler.
+    try:
+        await idle()
+    finally:
+        maintenance.shutdown()
+        # Bot.stop() flushes the buffered counters, active-user marks and IP logs.
+        await asyncio.gather(*[app.stop() for app in apps], return_exceptions=True)
+        await app_runner.cleanup()
+        await close_session()
+
+async def worker_runner(setups, socket_path):
+    """Run one shard of the bots behind the supervisor, serving its routes on a unix socket"""
+    # Samples from different workers must stay distinct once the front end merges them.
+    metrics.CONSTANT_LABELS['worker'] = os.path.splitext(os.path.basename(socket_path))[0]
+    apps = []
+    web_app = await web_server(apps, behind_supervisor=True, expected=len(setups))
+    app_runner = web.AppRunner(web_app)
+    await app_runner.setup()
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    await web.UnixSite(app_runner, socket_path).start()
+
+    await main_logic(setups, started=apps)
+
+    try:
+        # idle() returns on SIGTERM from the supervisor, so the bots get a clean stop.
+        await idle()
+    finally:
+        maintenance.shutdown()
+        await asyncio.gather(*[app.stop() for app in apps], return_exceptions=True)
+        await app_runner.cleanup()
+        await close_session()
+
+def worker_main(setups, socket_path):
+    try:
+        asyncio.run(worker_runner(setups, socket_path))
+    except KeyboardInterrupt:
+        pass
 
 if __name__ == "__main__":
     try:
-        asyncio.run(runner())
+        if BOT_PROCESSES > 1:
+            # Shard the bots across processes behind one front end on PORT.
+            supervisor = Supervisor(load_setups(), worker_main, BOT_PROCESSES)
+            asyncio.run(supervisor.run(int(os.environ.get("PORT", 8080))))
+        else:
+            asyncio.run(runner())
     except KeyboardInterrupt:
         print("\nBot stopped manually.")
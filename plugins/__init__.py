@@ -1,9 +1,38 @@
 from aiohttp import web
 from .route import routes
+from helper.health import HealthMonitor
+from helper import metrics
+
+async def healthz(request):
+    monitor = request.app['health']
+    body = {'status': 'ok' if monitor.healthy() else 'unhealthy', **monitor.snapshot}
+    return web.json_response(body, status=200 if monitor.healthy() else 503)
+
+async def readyz(request):
+    monitor = request.app['health']
+    body = {'status': 'ready' if monitor.ready() else 'not ready', 'expected_bots': monitor.expected, **monitor.snapshot}
+    return web.json_response(body, status=200 if monitor.ready() else 503)
+
+async def metrics_handler(request):
+    return web.Response(body=metrics.render().encode(), headers={"Content-Type": metrics.CONTENT_TYPE})
+
+async def _start_health(web_app):
+    web_app['health'].start()
+
+async def _stop_health(web_app):
+    web_app['health'].stop()
 
 # --- MODIFIED THIS FUNCTION ---
-async def web_server(bots):
+async def web_server(bots, behind_supervisor: bool = False, expected: int = None):
     web_app = web.Application(client_max_size=30000000)
     web_app['bots'] = bots  # Attach the list of bot instances to the app
+    web_app['behind_supervisor'] = behind_supervisor
+    # Probes only read the snapshot this monitor refreshes in the background.
+    web_app['health'] = HealthMonitor(bots, expected)
+    web_app.on_startup.append(_start_health)
+    web_app.on_cleanup.append(_stop_health)
     web_app.add_routes(routes)
+    web_app.router.add_get("/healthz", healthz, allow_head=True)
+    web_app.router.add_get("/readyz", readyz, allow_head=True)
+    web_app.router.add_get("/metrics", metrics_handler)
     return web_app
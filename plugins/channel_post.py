@@ -2,11 +2,10 @@ import asyncio
 from pyrogram import filters, Client
 from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
 from pyrogram.errors import FloodWait
-from helper.helper_func import encode
 
 #===============================================================#
 
-@Client.on_message(filters.private & ~filters.command(['start','users','broadcast','batch','genlink','usage', 'pbroadcast', 'ban', 'unban', 'authorize', 'unauthorize', 'authorized', 'request', 'profile', 'stats']))
+@Client.on_message(filters.private & ~filters.command(['start','users','broadcast','batch','genlink','usage', 'pbroadcast', 'ban', 'unban', 'authorize', 'unauthorize', 'authorized', 'request', 'profile', 'stats', 'loglevel']))
 async def channel_post(client: Client, message: Message):
     if message.from_user.id not in client.admins:
         return await message.reply(client.reply_text)
@@ -20,9 +19,7 @@ async def channel_post(client: Client, message: Message):
         print(e)
         await reply_text.edit_text("Something went Wrong..!")
         return
-    converted_id = post_message.id * abs(client.db)
-    string = f"get-{converted_id}"
-    base64_string = await encode(string)
+    base64_string = client.link_codec.encode(post_message.id)
     link = f"https://t.me/{client.username}?start={base64_string}"
 
     reply_markup = InlineKeyboardMarkup([[InlineKeyboardButton("🔁 Share URL", url=f'https://telegram.me/share/url?url={link}')]])
@@ -41,9 +38,7 @@ async def new_post(client: Client, message: Message):
     if client.disable_btn:
         return
 
-    converted_id = message.id * abs(client.db)
-    string = f"get-{converted_id}"
-    base64_string = await encode(string)
+    base64_string = client.link_codec.encode(message.id)
     link = f"https://t.me/{client.username}?start={base64_string}"
     reply_markup = InlineKeyboardMarkup([[InlineKeyboardButton("🔁 Share URL", url=f'https://telegram.me/share/url?url={link}')]])
     try:
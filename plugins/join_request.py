@@ -1,5 +1,7 @@
 from pyrogram import Client, filters
-from pyrogram.types import ChatJoinRequest
+from pyrogram.enums import ChatMemberStatus
+from pyrogram.types import ChatJoinRequest, ChatMemberUpdated
+from helper.helper_func import SUBSCRIBED_STATUSES
 
 #===============================================================#
 
@@ -13,5 +15,20 @@ async def handle_join_request(client, join_request: ChatJoinRequest):
     if is_banned:
         return
     if channel:
+        client.sub_cache.set((channel_id, user_id), ChatMemberStatus.MEMBER)
         return await client.mongodb.add_channel_user(channel_id, user_id)
-        
\ No newline at end of file
+
+#===============================================================#
+
+@Client.on_chat_member_updated(filters.channel)
+async def handle_member_update(client, update: ChatMemberUpdated):
+    channel_id = update.chat.id
+    if channel_id not in client.fsub_dict or not update.new_chat_member or not update.new_chat_member.user:
+        return
+    key = (channel_id, update.new_chat_member.user.id)
+    status = update.new_chat_member.status
+    if status in SUBSCRIBED_STATUSES:
+        client.sub_cache.set(key, status)
+    else:
+        # A request-mode channel may still count the user as subscribed, so let the next check decide.
+        client.sub_cache.pop(key)
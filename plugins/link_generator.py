@@ -1,6 +1,6 @@
 from pyrogram import Client, filters
 from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
-from helper.helper_func import encode, get_message_id
+from helper.helper_func import get_message_id
 
 @Client.on_message(filters.private & filters.command('batch'))
 async def batch(client: Client, message: Message):
@@ -31,8 +31,7 @@ async def batch(client: Client, message: Message):
             continue
 
 
-    string = f"get-{f_msg_id * abs(client.db_channel.id)}-{s_msg_id * abs(client.db_channel.id)}"
-    base64_string = await encode(string)
+    base64_string = client.link_codec.encode(min(f_msg_id, s_msg_id), max(f_msg_id, s_msg_id))
     link = f"https://t.me/{client.username}?start={base64_string}"
     reply_markup = InlineKeyboardMarkup([[InlineKeyboardButton("🔁 Share URL", url=f'https://telegram.me/share/url?url={link}')]])
     await second_message.reply_text(f"<b>Here is your link</b>\n\n{link}", quote=True, reply_markup=reply_markup)
@@ -55,7 +54,7 @@ async def link_generator(client: Client, message: Message):
             await channel_message.reply("❌ Error\n\nthis Forwarded Post is not from my DB Channel or this Link is not taken from DB Channel", quote = True)
             continue
 
-    base64_string = await encode(f"get-{msg_id * abs(client.db_channel.id)}")
+    base64_string = client.link_codec.encode(msg_id)
     link = f"https://t.me/{client.username}?start={base64_string}"
     reply_markup = InlineKeyboardMarkup([[InlineKeyboardButton("🔁 Share URL", url=f'https://telegram.me/share/url?url={link}')]])
     await channel_message.reply_text(f"<b>Here is your link</b>\n\n{link}", quote=True, reply_markup=reply_markup)
@@ -94,8 +93,7 @@ async def nbatch(client: Client, message: Message):
     
     s_msg_id = f_msg_id + batch_size - 1  # Adding batch_size to first message ID
     
-    string = f"get-{f_msg_id * abs(client.db_channel.id)}-{s_msg_id * abs(client.db_channel.id)}"
-    base64_string = await encode(string)
+    base64_string = client.link_codec.encode(f_msg_id, max(s_msg_id, f_msg_id))
     link = f"https://t.me/{client.username}?start={base64_string}"
     
     reply_markup = InlineKeyboardMarkup([
@@ -0,0 +1,20 @@
+from pyrogram import Client, filters
+from pyrogram.types import Message
+
+import config
+
+LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+
+@Client.on_message(filters.command('loglevel') & filters.private)
+async def log_level_command(client: Client, message: Message):
+    """Owner-only: /loglevel <logger> <level>, e.g. /loglevel helper.helper_func DEBUG"""
+    if message.from_user.id != config.OWNER_ID:
+        return await message.reply("❌ This command is for the owner only.")
+
+    if len(message.command) != 3 or message.command[2].upper() not in LEVELS:
+        return await message.reply(f"Usage: <code>/loglevel &lt;logger&gt; &lt;{'|'.join(LEVELS)}&gt;</code>")
+
+    name, level = message.command[1], message.command[2].upper()
+    config.set_log_level(name, level)
+    client.LOGGER(__name__, client.session_name).info(f"Log level of {name} set to {level}")
+    await message.reply(f"✅ Log level of <code>{name}</code> set to <b>{level}</b>.")
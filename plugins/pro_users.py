@@ -1,11 +1,12 @@
 from pyrogram import Client, filters
-from pyrogram.types import Message
+from pyrogram.types import Message, CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
 from datetime import datetime, timedelta, timezone
 from pyrogram.errors import PeerIdInvalid, UserIsBlocked, InputUserDeactivated
 from zoneinfo import ZoneInfo
 
 from bot import Bot
 import config  # Corrected import
+from helper.helper_func import remember_profile, resolve_profiles
 
 # Define the Indian Standard Time zone
 IST = ZoneInfo("Asia/Kolkata")
@@ -70,6 +71,7 @@ async def add_premium_command(client: Bot, message: Message):
             expires_at_ist_display = start_date_ist + delta
             expires_at_utc = expires_at_ist_display.astimezone(timezone.utc)
             await client.mongodb.add_pro(user_id_to_add, expires_at_utc)
+            client.pro_expiry.wake()
 
         except Exception as e:
             await message.reply_text(f"❌ ᴀɴ ᴇʀʀᴏʀ ᴏᴄᴄᴜʀʀᴇᴅ ᴅᴜʀɪɴɢ ᴀᴜᴛʜᴏʀɪᴢᴀᴛɪᴏɴ: {e}")
@@ -145,40 +147,30 @@ async def rev_premium_command(client: Bot, message: Message):
 @Client.on_message(filters.command('premium_users') & filters.private)
 async def premium_users_command(client: Bot, message: Message):
     # Check if user is owner or admin
-    if message.from_user.id != config.OWNER_ID and message.from_user.id not in config.ADMINS:
+    if message.from_user.id != client.owner and message.from_user.id not in client.admins:
         await message.reply_text("❌ ᴏɴʟʏ ᴏᴡɴᴇʀ ᴀɴᴅ ᴀᴅᴍɪɴs ᴄᴀɴ ᴜsᴇ ᴛʜɪs ᴄᴏᴍᴍᴀɴᴅ.")
         return
 
-    pro_user_docs = await client.mongodb.get_pros_list()
-    
-    active_users = []
-    expired_user_ids_to_remove = []
-    now_utc = datetime.now(timezone.utc)
+    # Expired users are skipped by the active filter; the background worker removes and notifies them.
+    client.pro_expiry.wake()
+    active_users = await client.mongodb.get_active_pros(limit=1)
 
-    for user_doc in pro_user_docs:
-        expires_at = user_doc.get('expires_at')
-        if expires_at and isinstance(expires_at, datetime):
-            if expires_at.tzinfo is None:
-                expires_at = expires_at.replace(tzinfo=timezone.utc)
-            
-            if expires_at < now_utc:
-                expired_user_ids_to_remove.append(user_doc['_id'])
-                continue
-        
-        active_users.append(user_doc)
+    if not active_users:
+        return await message.reply_text("☔ ɴᴏ ᴀᴄᴛɪᴠᴇ ᴘʀᴇᴍɪᴜᴍ ᴜsᴇʀs ғᴏᴜɴᴅ.")
 
-    cleanup_notice = ""
-    if expired_user_ids_to_remove:
-        client.LOGGER(__name__, "PREMIUM_USERS_CMD").info(f"Found {len(expired_user_ids_to_remove)} expired users. Cleaning up now...")
-        for user_id in expired_user_ids_to_remove:
-            await client.mongodb.remove_pro(user_id)
-        cleanup_notice = f"🥂 (ᴄʟᴇᴀɴᴇᴅ ᴜᴘ {len(expired_user_ids_to_remove)} ᴇxᴘɪʀᴇᴅ ᴜsᴇʀs.)\n\n"
+    text, reply_markup = await render_premium_page(client, 0)
+    await message.reply_text(text, reply_markup=reply_markup, disable_web_page_preview=True)
 
-    if not active_users:
-        return await message.reply_text(f"{cleanup_notice}☔ ɴᴏ ᴀᴄᴛɪᴠᴇ ᴘʀᴇᴍɪᴜᴍ ᴜsᴇʀs ғᴏᴜɴᴅ.")
+async def render_premium_page(client: Bot, page: int):
+    page_size = config.PREMIUM_PAGE_SIZE
+    total = await client.mongodb.count_active_pros()
+    pages = max((total + page_size - 1) // page_size, 1)
+    page = min(max(page, 0), pages - 1)
+    user_docs = await client.mongodb.get_active_pros(skip=page * page_size, limit=page_size)
+    profiles = await resolve_profiles(client, [doc['_id'] for doc in user_docs])
 
     formatted_users = []
-    for user_doc in active_users:
+    for user_doc in user_docs:
         user_id = user_doc['_id']
         expires_at = user_doc.get('expires_at')
         expiry_text = "🍥 sᴛᴀᴛᴜs: ᴘᴇʀᴍᴀɴᴇɴᴛ"
@@ -188,22 +180,41 @@ async def premium_users_command(client: Bot, message: Message):
             ist_expires_at = expires_at.astimezone(IST)
             expiry_text = f"⛱️ ᴇxᴘɪʀᴇs: {ist_expires_at.strftime('%ᴅ %ʙ %ʏ, %ʜ:%ᴍ %ᴢ')}"
 
-        try:
-            user = await client.get_users(user_id)
-            full_name = user.first_name + (" " + user.last_name if user.last_name else "")
-            username = f"@{user.username}" if user.username else "ɴ/ᴀ"
+        profile = profiles.get(user_id)
+        if profile:
+            full_name, username = profile
             formatted_users.append(
                 f"🎩 {full_name}\n"
-                f"   🎋 ɪᴅ: <code>{user.id}</code>\n"
-                f"   🍷 ᴜsᴇʀɴᴀᴍᴇ: {username}\n"
+                f"   🎋 ɪᴅ: <code>{user_id}</code>\n"
+                f"   🍷 ᴜsᴇʀɴᴀᴍᴇ: {'@' + username if username else 'ɴ/ᴀ'}\n"
                 f"   {expiry_text}"
             )
-        except Exception:
+        else:
             formatted_users.append(
                 f"🎩 ᴜsᴇʀ ɪᴅ: <code>{user_id}</code> (ɪɴғᴏ ɴᴏᴛ ғᴇᴛᴄʜᴀʙʟᴇ)\n"
                 f"   {expiry_text}"
             )
 
-    response_text = f"{cleanup_notice}🌀 ᴘʀᴇᴍɪᴜᴍ ᴜsᴇʀs ʟɪsᴛ:\n\n" + "\n\n".join(formatted_users)
-    for chunk in [response_text[i:i + 4096] for i in range(0, len(response_text), 4096)]:
-        await message.reply_text(chunk, disable_web_page_preview=True)
+    text = f"🌀 ᴘʀᴇᴍɪᴜᴍ ᴜsᴇʀs ʟɪsᴛ ({total}) — ᴘᴀɢᴇ {page + 1}/{pages}:\n\n" + "\n\n".join(formatted_users)
+    buttons = []
+    if page > 0:
+        buttons.append(InlineKeyboardButton('◂ ᴘʀᴇᴠ', f'premium_users_{page - 1}'))
+    if page < pages - 1:
+        buttons.append(InlineKeyboardButton('ɴᴇxᴛ ▸', f'premium_users_{page + 1}'))
+    return text, InlineKeyboardMarkup([buttons]) if buttons else None
+
+@Client.on_callback_query(filters.regex(r"^premium_users_(\d+)$"))
+async def premium_users_page(client: Bot, query: CallbackQuery):
+    if query.from_user.id != client.owner and query.from_user.id not in client.admins:
+        return await query.answer("❌ ᴏɴʟʏ ᴏᴡɴᴇʀ ᴀɴᴅ ᴀᴅᴍɪɴs ᴄᴀɴ ᴜsᴇ ᴛʜɪs.", show_alert=True)
+    text, reply_markup = await render_premium_page(client, int(query.matches[0].group(1)))
+    await query.message.edit_text(text, reply_markup=reply_markup, disable_web_page_preview=True)
+    await query.answer()
+
+#========================================================================#
+
+@Client.on_message(filters.private & filters.incoming, group=1)
+async def refresh_profile(client: Bot, message: Message):
+    # Keeps cached names fresh from ordinary traffic so /premium_users rarely needs get_users.
+    if message.from_user and client.profile_cache.get(message.from_user.id) is not None:
+        remember_profile(client, message.from_user)
@@ -2,23 +2,37 @@ from aiohttp import web
 import markdown
 import os
 import asyncio
+import gzip
+import hashlib
+import time
+from email.utils import formatdate
 from helper.helper_func import send_files # Import the refactored function
+from helper.database import webrequest_session
 
 routes = web.RouteTableDef()
 
-@routes.get("/", allow_head=True)
-async def root_route_handler(request):
-    # Correct the path to point to the project's root README.md
-    readme_path = os.path.join(os.path.dirname(__file__), "..", "README.md")
-    if not os.path.exists(readme_path):
-        return web.Response(text="README.md not found", status=404)
+# Keeps a reference to running deliveries so they aren't garbage collected.
+delivery_tasks = set()
 
-    with open(readme_path, "r", encoding="utf-8") as f:
-        md_text = f.read()
+README_PATH = os.path.join(os.path.dirname(__file__), "..", "README.md")
+README_CHECK_INTERVAL = 5 # seconds between mtime checks of README.md
 
-    html = markdown.markdown(md_text, extensions=["fenced_code", "codehilite", "tables"])
+class ReadmePage:
+    """README.md rendered once and re-rendered only when the file's mtime changes."""
 
-    html_page = f"""
+    def __init__(self, path: str):
+        self.path = path
+        self.mtime = None
+        self.checked = 0.0
+        self.body = None
+        self.gzipped = None
+        self.etag = None
+        self.gzip_etag = None
+        self.last_modified = None
+
+    def _render(self, md_text: str) -> str:
+        html = markdown.markdown(md_text, extensions=["fenced_code", "codehilite", "tables"])
+        return f"""
     <!DOCTYPE html>
     <html lang="en">
     <head>
@@ -36,7 +50,58 @@ async def root_route_handler(request):
     <body>{html}</body>
     </html>
     """
-    return web.Response(text=html_page, content_type="text/html")
+
+    def refresh(self) -> bool:
+        """Re-render if README.md changed; returns False when the file is missing"""
+        now = time.monotonic()
+        if self.body is not None and now - self.checked < README_CHECK_INTERVAL:
+            return True
+        self.checked = now
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            self.body = None
+            return False
+        if mtime != self.mtime:
+            with open(self.path, "r", encoding="utf-8") as f:
+                body = self._render(f.read()).encode("utf-8")
+            self.mtime = mtime
+            self.body = body
+            self.gzipped = gzip.compress(body)
+            # A strong ETag must differ per representation, so the gzip body gets its own.
+            digest = hashlib.sha1(body).hexdigest()
+            self.etag = f'"{digest}"'
+            self.gzip_etag = f'"{digest}-gzip"'
+            self.last_modified = formatdate(mtime, usegmt=True)
+        return True
+
+    def not_modified(self, request, etag: str) -> bool:
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match is not None:
+            return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+        if_modified_since = request.if_modified_since
+        return if_modified_since is not None and int(self.mtime) <= if_modified_since.timestamp()
+
+readme_page = ReadmePage(README_PATH)
+
+@routes.get("/", allow_head=True)
+async def root_route_handler(request):
+    if not readme_page.refresh():
+        return web.Response(text="README.md not found", status=404)
+
+    gzipped = "gzip" in request.headers.get("Accept-Encoding", "")
+    headers = {
+        "ETag": readme_page.gzip_etag if gzipped else readme_page.etag, "Last-Modified": readme_page.last_modified,
+        "Cache-Control": "public, max-age=60", "Vary": "Accept-Encoding"
+    }
+    if readme_page.not_modified(request, headers["ETag"]):
+        return web.Response(status=304, headers=headers)
+
+    body = readme_page.body
+    if gzipped:
+        body = readme_page.gzipped
+        headers["Content-Encoding"] = "gzip"
+    return web.Response(body=body, headers=headers, content_type="text/html", charset="utf-8")
 
 
 # --- NEW WEB HANDLER FOR SECURE FILE RETRIEVAL ---
@@ -50,10 +115,18 @@ async def get_file_handler(request):
     if not bots:
         return web.Response(text="Bot service is temporarily unavailable.", status=503)
 
-    # Use the first bot's DB instance for the initial lookup.
-    # The session_name stored with the token ensures we use the correct bot later.
-    db = bots[0].mongodb 
-    req_data = await db.get_webrequest(token)
+    # Tokens are "<session>.<random>", so the owning bot (and its DB) is known before any lookup.
+    session_name = webrequest_session(token)
+    target_bot = next((b for b in bots if b.session_name == session_name), None)
+
+    if not target_bot:
+        if session_name and request.app.get('behind_supervisor'):
+            # The bot runs in another worker process; let the front end re-route the request.
+            return web.Response(text="Misdirected request.", status=421, headers={"X-Bot-Session": session_name})
+        return web.Response(text="Bot service is temporarily unavailable.", status=503)
+
+    # find_one_and_delete claims the token in one round trip, so a replayed or racing request gets nothing.
+    req_data = await target_bot.mongodb.claim_webrequest(token)
 
     if not req_data:
         return web.Response(
@@ -62,27 +135,19 @@ async def get_file_handler(request):
             status=403
         )
 
-    # Immediately delete the token on first use to prevent replay attacks.
-    await db.delete_webrequest(token)
-
-    # Extract data needed to process the request
     user_id = req_data['user_id']
     b64_string = req_data['b64_string']
-    session_name = req_data['session']
-    
-    # Find the specific bot instance that this request belongs to
-    target_bot = next((b for b in bots if b.session_name == session_name), None)
-    
-    if not target_bot:
-        return web.Response(text=f"Bot instance '{session_name}' is currently offline.", status=503)
-        
-    # Log the user's IP address using their specific bot's DB connection
-    ip_address = request.headers.get("X-Forwarded-For") or request.remote
-    await target_bot.mongodb.log_user_ip(user_id, ip_address, target_bot.session_name)
+
+    # Queued and written in batches with the bot's counters.
+    forwarded_for = request.headers.get("X-Forwarded-For", "")
+    ip_address = forwarded_for.split(",")[0].strip() or request.remote
+    target_bot.mongodb.log_user_ip(user_id, ip_address, target_bot.session_name)
     
     # Schedule the file sending as a background task. This immediately frees up
     # the web server to respond to the user without waiting for files to send.
-    asyncio.create_task(send_files(target_bot, user_id, b64_string))
+    task = asyncio.create_task(send_files(target_bot, user_id, b64_string))
+    delivery_tasks.add(task)
+    task.add_done_callback(delivery_tasks.discard)
     
     # Return a success page to the user's browser.
     return web.Response(
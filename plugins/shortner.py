@@ -1,34 +0,0 @@
-import requests
-import random
-import string
-# MODIFICATION: Remove this import
-# from config import SHORT_URL, SHORT_API
-
-# ✅ In-memory cache
-shortened_urls_cache = {}
-
-def generate_random_alphanumeric():
-    characters = string.ascii_letters + string.digits
-    return ''.join(random.choice(characters) for _ in range(8))
-
-def get_short(url, client):
-
-    # Step 2: Check cache
-    if url in shortened_urls_cache:
-        return shortened_urls_cache[url]
-
-    try:
-        alias = generate_random_alphanumeric()
-        # MODIFICATION: Use client instance variables
-        api_url = f"https://{client.short_url}/api?api={client.short_api}&url={url}&alias={alias}"
-        response = requests.get(api_url)
-        rjson = response.json()
-
-        if rjson.get("status") == "success" and response.status_code == 200:
-            short_url = rjson.get("shortenedUrl", url)
-            shortened_urls_cache[url] = short_url
-            return short_url
-    except Exception as e:
-        print(f"[Shortener Error] {e}")
-
-    return url  # fallback
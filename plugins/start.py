@@ -6,17 +6,15 @@ from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton,
 import humanize
 import time
 import secrets
-import random
-import string as rohit_string
 from datetime import datetime
 from zoneinfo import ZoneInfo
-from plugins.shortner import get_short
+from helper.shortner import get_short, generate_verify_token
 import config
 
 IST = ZoneInfo("Asia/Kolkata")
-CACHE_TTL_SECONDS = 300
 
 @Client.on_message(filters.command('start') & filters.private)
+@timed('start')
 @force_sub
 async def start_command(client: Client, message: Message):
     user_id = message.from_user.id
@@ -24,6 +22,7 @@ async def start_command(client: Client, message: Message):
     user_state, _ = await client.mongodb.get_user_state(user_id)
     if user_state is None: return await message.reply("A critical database error occurred.")
     if user_state.get('banned', False): return await message.reply("**You have been banned from using this bot!**")
+    client.mongodb.mark_active(user_id)
 
     if len(message.command) > 1:
         payload = message.command[1]
@@ -39,7 +38,7 @@ async def start_command(client: Client, message: Message):
             verify_status['verified_time'] = time.time()
             verify_status['verify_token'] = ""
             await client.mongodb.update_verify_status(user_id, verify_status)
-            await client.mongodb.increment_verify_count()
+            client.mongodb.increment_verify_count()
             
             file_payload = verify_status.get('file_payload')
             buttons = [[InlineKeyboardButton("✖️ ᴄʟᴏꜱᴇ", callback_data="close")]]
@@ -62,14 +61,21 @@ async def start_command(client: Client, message: Message):
         if is_still_verified:
             return await send_files(client, user_id, base64_string)
         else:
-            token = ''.join(random.choices(rohit_string.ascii_letters + rohit_string.digits, k=10))
+            # Prefer a pre-shortened link from the pool; only shorten inline when it is empty.
+            claimed = await client.verify_pool.claim()
+            if claimed:
+                token, short_link = claimed
+            else:
+                token = generate_verify_token()
+                short_link = None
             
             verify_status['verify_token'] = token
             verify_status['file_payload'] = base64_string
             await client.mongodb.update_verify_status(user_id, verify_status)
             
-            link = f"https://t.me/{client.username}?start=verify_{token}"
-            short_link = get_short(link, client)
+            if not short_link:
+                link = f"https://t.me/{client.username}?start=verify_{token}"
+                short_link = await get_short(link, client, cache=False)
 
             btn = [[InlineKeyboardButton("• ᴏᴘᴇɴ ʟɪɴᴋ •", url=short_link), InlineKeyboardButton("• ᴛᴜᴛᴏʀɪᴀʟ •", url=config.TUT_VID)],[InlineKeyboardButton("• ʙᴜʏ ᴘʀᴇᴍɪᴜᴍ •", url="https://t.me/Rtx_Contect_bot")]]
             verify_photo = client.messages.get("VERIFY_PHOTO", "")
@@ -105,18 +111,11 @@ async def get_file_callback_handler(client: Client, query: CallbackQuery):
     await send_files(client, query.from_user.id, base64_string)
     await query.message.edit_reply_markup(reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("✖️ ᴅᴏɴᴇ", callback_data="close")]]))
 
-async def get_user_state_with_cache(client: Client, user_id: int):
-    now = time.time()
-    state, pro_expires_at = await client.mongodb.get_user_state(user_id)
-    if state is not None:
-        client.user_cache[user_id] = {'state': state, 'timestamp': now, 'pro_expires_at': pro_expires_at}
-    return state
-
 @Client.on_message(filters.command('request') & filters.private)
 async def request_command(client: Client, message: Message):
     user_id = message.from_user.id
     if user_id in client.admins or user_id == client.owner: return await message.reply_text("🔹 **Admins cannot make requests.**")
-    user_state = await get_user_state_with_cache(client, user_id)
+    user_state, _ = await client.mongodb.get_user_state(user_id)
     if user_state is None or not user_state.get('is_pro', False): return await message.reply("❌ **Only premium users can make requests.**", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("ʙᴜʏ ᴘʀᴇᴍɪᴜᴍ •", url="https://t.me/Rtx_Contect_bot")]]))
     if len(message.command) < 2: return await message.reply("⚠️ **Usage:**\n`/request <content name>`")
     owner_message = f"📩 **New Request**\n\n**From:** {message.from_user.mention} (`{user_id}`)\n**Request:** `{' '.join(message.command[1:])}`"
@@ -131,7 +130,7 @@ async def request_command(client: Client, message: Message):
 async def my_plan(client: Client, message: Message):
     user_id = message.from_user.id
     if user_id in client.admins or user_id == client.owner: return await message.reply_text("🔹 **You're an admin. You have access to everything!**")
-    user_state = await get_user_state_with_cache(client, user_id)
+    user_state, _ = await client.mongodb.get_user_state(user_id)
     if user_state is None: return await message.reply("Could not fetch profile due to a database error.")
     if user_state.get('is_pro', False):
         pro_data = await client.mongodb.get_pro_user(user_id)
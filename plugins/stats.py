@@ -2,6 +2,7 @@
 
 from pyrogram import Client, filters
 from pyrogram.types import Message
+from helper.maintenance import maintenance
 
 @Client.on_message(filters.command('stats') & filters.private)
 async def stats_command(client: Client, message: Message):
@@ -11,17 +12,30 @@ async def stats_command(client: Client, message: Message):
     try:
         today_verifies, yesterday_verifies = await client.mongodb.get_verify_stats()
         
-        total_users = await client.mongodb.full_userbase()
+        total_users = await client.mongodb.get_total_users()
+        today_users = await client.mongodb.get_daily_user_stats()
         
         stats_message = (
             f"📊 **Bot Statistics**\n\n"
             f"👤 **User Base:**\n"
-            f"   - Total Users: `{len(total_users)}`\n\n"
+            f"   - Total Users: `{total_users}`\n"
+            f"   - New Today: `{today_users['new_users']}`\n"
+            f"   - Active Today: `{today_users['active_users']}`\n"
+            f"   - Blocked Today: `{today_users['blocked_users']}`\n\n"
             f"✅ **Token Verifications:**\n"
             f"   - **Today:** `{today_verifies}` verifications\n"
             f"   - **Yesterday:** `{yesterday_verifies}` verifications"
         )
 
+        jobs = maintenance.status(client.session_name)
+        if jobs:
+            stats_message += "\n\n🛠 **Maintenance:**"
+            for job in jobs:
+                last = f"{job['last_duration']:.2f}s" if job['last_duration'] is not None else "not run yet"
+                next_run = job['next_run'].strftime('%d %b %H:%M') if job['next_run'] else "-"
+                failed = " (failed)" if job['last_error'] else ""
+                stats_message += f"\n   - {job['name']}: last `{last}`{failed}, next `{next_run}`"
+
         await message.reply_text(stats_message)
 
     except Exception as e: